@@ -1,9 +1,13 @@
 import os
+import threading
+import time
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 load_dotenv()
 
@@ -15,7 +19,129 @@ DB_NAME = os.getenv("DB_NAME")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL, echo=True)
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Pool settings, shared by every engine of the process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+
+# Per-statement limit in milliseconds, 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+
+# SQL logging is synchronous; only turn it on when developing
+DB_ECHO = env_flag("DB_ECHO", os.getenv("FLASK_ENV") == "development")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording how long callers wait to check out a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def recreate(self):
+        # pre-ping/dispose swap in a fresh pool; keep the counters going
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts = self.checkouts, self.timeouts
+        pool.total_wait, pool.max_wait = self.total_wait, self.max_wait
+        return pool
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            return {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "overflow": self.overflow(),
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": (
+                    round(self.total_wait / checkouts * 1000, 3) if checkouts else 0.0
+                ),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+def engine_options(statement_timeout_ms: int = None) -> dict:
+    """create_engine() keyword arguments built from the DB_* settings"""
+    if statement_timeout_ms is None:
+        statement_timeout_ms = DB_STATEMENT_TIMEOUT_MS
+
+    options = {
+        "echo": DB_ECHO,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if statement_timeout_ms:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={statement_timeout_ms}"
+        }
+    return options
+
+
+def make_engine(url: str = DATABASE_URL, statement_timeout_ms: int = None):
+    """
+    Engine factory. The API uses the module level `engine`; scripts call
+    this for their own URL, e.g. statement_timeout_ms=0 for long DDL.
+    """
+    return create_engine(url, **engine_options(statement_timeout_ms))
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# One session per request (per thread), shared by controllers, services and
+# helpers so a request holds a single connection. Removed on teardown by
+# init_app(); background threads create their own SessionLocal() instead.
+db_session = scoped_session(SessionLocal)
+
+
+def get_db():
+    """The session of the current request"""
+    return db_session()
+
+
+def init_app(app):
+    @app.teardown_appcontext
+    def remove_db_session(exception=None):
+        db_session.remove()
+
+
+def pool_metrics() -> dict:
+    """Connection pool usage and checkout wait times of the API engine"""
+    return engine.pool.metrics()
+
+
 Base = declarative_base()
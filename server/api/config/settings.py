@@ -1,6 +1,6 @@
 import os
 
-from sqlalchemy.engine.url import URL
+from config.db import DATABASE_URL
 
 BASEDIR = os.path.abspath(os.path.dirname(__file__))
 
@@ -10,18 +10,13 @@ class Config:
     FLASK_ENV = os.getenv("FLASK_ENV")
     DEBUG = os.getenv("DEBUG")
 
+    # Same database as config.db.engine, so flask db migrate sees it
+    SQLALCHEMY_DATABASE_URI = DATABASE_URL
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
 
-    SQLALCHEMY_DATABASE_URI = URL.create(
-        "postgresql+psycopg2",
-        username=os.getenv("DB_USERNAME"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        database=os.getenv("DB_NAME"),
-    )
-
     # url_object = URL.create(
     #     "postgresql+psycopg2",  # this is the used driver to connect with the db & manage connection to it
     #     username=os.getenv("DB_USERNAME"),
@@ -1,16 +1,31 @@
 from flask import Blueprint, jsonify, request
 from sqlalchemy import func, text
 from sqlalchemy.exc import IntegrityError
-from config.db import SessionLocal
-from core.models import User, Job, Application, ReportedJob, Skill, Category, ConnectionRequest, DeleteRequest, Education, Notification, Experience
-from werkzeug.security import generate_password_hash
-import jwt
-import os
+from config.db import get_db, pool_metrics
+from core.models import User, Job, Application, ReportedJob, Skill, Category, ConnectionRequest, DeleteRequest, Education, Notification, Experience, job_skills
+from services.search_service import refresh_job_search_vectors
+from services.applications_service import unlink_user_applications
+from services.recommendation_service import (
+    invalidate_job_index,
+    remove_job_from_index,
+)
+from services.analytics_service import time_series
+from services.rollup_service import (
+    rollup_totals,
+    rollup_monthly,
+    rollups_refreshed_at,
+)
+from services.principal_service import invalidate_principal
+from controllers.job import job_load_options, jobs_to_dicts
+from services.autocomplete_service import (
+    add_suggestion,
+    remove_suggestion,
+    rename_suggestion,
+)
+from services.password_service import hash_password
 from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 
-SECRET_KEY = os.getenv("JWT_SECRET")
-
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 
@@ -18,13 +33,13 @@ admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 # 1. GET /admin/stats → Platform metrics
 # ============================================================
 def get_platform_stats():
-    db = SessionLocal()
-
-    total_users = db.query(func.count(User.id)).scalar()
-    total_jobs = db.query(func.count(Job.id)).scalar()
-    total_applications = db.query(func.count(Application.id)).scalar()
-
-    db.close()
+    db = get_db()
+    # Precomputed daily rollups, refreshed in the background: the totals
+    # are as of `as_of` (None while they are counted live)
+    total_users = sum(rollup_totals(db, "users").values())
+    total_jobs = sum(rollup_totals(db, "jobs").values())
+    total_applications = sum(rollup_totals(db, "applications").values())
+    as_of = rollups_refreshed_at(db)
 
     return (
         jsonify(
@@ -32,6 +47,7 @@ def get_platform_stats():
                 "total_users": total_users,
                 "total_jobs": total_jobs,
                 "total_applications": total_applications,
+                "as_of": as_of.isoformat() if as_of else None,
             }
         ),
         200,
@@ -42,7 +58,7 @@ def get_platform_stats():
 # 2. GET /admin/users → List all users
 # ============================================================
 def get_all_users():
-    db = SessionLocal()
+    db = get_db()
 
     users = db.query(User).filter(User.role != "admin").all()
     print(users)
@@ -61,7 +77,6 @@ def get_all_users():
         for u in users
     ]
 
-    db.close()
     return jsonify(data), 200
 
 
@@ -70,11 +85,10 @@ def get_all_users():
 # ============================================================
 
 def delete_user(user_id):
-    db = SessionLocal()
+    db = get_db()
 
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
-        db.close()
         return jsonify({"error": "User not found"}), 404
 
     try:
@@ -112,27 +126,31 @@ def delete_user(user_id):
             text("DELETE FROM user_skills WHERE user_id = :uid"),
             {"uid": user_id},
         )
-        db.execute(
-            text("DELETE FROM job_applicants WHERE user_id = :uid"),
-            {"uid": user_id},
-        )
+        unlink_user_applications(db, user_id)
 
         # Jobs posted by user
         jobs = db.query(Job).filter(Job.employer_id == user_id).all()
-        for job in jobs:
-            delete_job_internal(job.id, db)
+        removed_job_ids = [job.id for job in jobs]
+        removed_jobs = [delete_job_internal(job_id, db) for job_id in removed_job_ids]
 
         # Delete user
+        company_name = user.companyName
         db.delete(user)
         db.commit()
+        invalidate_principal(user_id)
+
+        for title, company in removed_jobs:
+            remove_suggestion("job_title", title)
+            remove_suggestion("company", company)
+        remove_suggestion("company", company_name)
+        for job_id in removed_job_ids:
+            remove_job_from_index(job_id)
 
         return jsonify({"message": "User deleted successfully"}), 200
 
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
@@ -165,32 +183,18 @@ def delete_job_internal(job_id, db):
     for rj in reported_jobs:
         db.delete(rj)
 
+    removed = (job.title, job.company)
     db.delete(job)
+    return removed
 
 
 # ============================================================
 # 4. GET /admin/jobs → List all jobs
 # ============================================================
 def get_all_jobs():
-    db = SessionLocal()
-    jobs = db.query(Job).all()
-
-    data = [
-        {
-            "id": j.id,
-            "title": j.title,
-            "company": j.company,
-            "location": j.location,
-            "emp_type": j.emp_type,
-            "salary_range": j.salary_range,
-            "employer_id": j.employer_id,
-            "category_id": j.category_id,
-            "created_at": j.created_at.isoformat() if j.created_at else None,
-        }
-        for j in jobs
-    ]
-
-    db.close()
+    db = get_db()
+    jobs = db.query(Job).options(*job_load_options()).all()
+    data = jobs_to_dicts(jobs)
     return jsonify(data), 200
 
 
@@ -198,16 +202,17 @@ def get_all_jobs():
 # 5. DELETE /admin/jobs/<id> → Delete job
 # ============================================================
 def delete_job(job_id):
-    db = SessionLocal()
+    db = get_db()
     try:
-        delete_job_internal(job_id, db)
+        title, company = delete_job_internal(job_id, db)
         db.commit()
+        remove_suggestion("job_title", title)
+        remove_suggestion("company", company)
+        remove_job_from_index(job_id)
         return jsonify({"message": f"Job {job_id} deleted successfully"}), 200
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
@@ -216,12 +221,11 @@ def delete_job(job_id):
 # 6. GET /admin/skills → List all skills
 # ============================================================
 def get_all_skills():
-    db = SessionLocal()
+    db = get_db()
     skills = db.query(Skill).all()
 
     data = [{"id": s.id, "name": s.name} for s in skills]
 
-    db.close()
     return jsonify(data), 200
 
 
@@ -229,7 +233,7 @@ def get_all_skills():
 # 7. POST /admin/skills → add skill
 # ============================================================
 def add_skill():
-    db = SessionLocal()
+    db = get_db()
 
     data = request.get_json()
     name = data.get("name")
@@ -250,7 +254,8 @@ def add_skill():
         return jsonify({"error": "Skill already exists"}), 400
 
     db.refresh(new_skill)
-    db.close()
+
+    add_suggestion("skill", new_skill.name)
 
     return jsonify({"id": new_skill.id, "name": new_skill.name})
 
@@ -259,7 +264,7 @@ def add_skill():
 # 8. DELETE /admin/skills/<id> → Delete skill
 # ============================================================
 def delete_skill(skill_id):
-    db = SessionLocal()
+    db = get_db()
     try:
         db.execute(
             text("DELETE FROM user_skills WHERE skill_id = :sid"),
@@ -274,16 +279,18 @@ def delete_skill(skill_id):
         if not skill:
             return jsonify({"error": "Skill not found"}), 404
 
+        skill_name = skill.name
         db.delete(skill)
         db.commit()
 
+        remove_suggestion("skill", skill_name)
+        invalidate_job_index()
+
         return jsonify({"message": "Skill deleted successfully"}), 200
 
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
@@ -291,24 +298,35 @@ def delete_skill(skill_id):
 # 9. PUT /admin/skills/<id> → Update skill
 # ============================================================
 def update_skill(skill_id):
-    db = SessionLocal()
+    db = get_db()
 
     skill = db.query(Skill).filter(Skill.id == skill_id).first()
 
     if not skill:
-        db.close()
         return jsonify({"error": "Skill not found"}), 404
 
     data = request.get_json()
     new_name = data.get("name")
 
     if not new_name:
-        db.close()
         return jsonify({"error": "Missing field: name"}), 400
 
+    old_name = skill.name
     skill.name = new_name
+
+    # Keep the full-text index of jobs requiring this skill in sync
+    job_ids = [
+        job_id
+        for (job_id,) in db.query(job_skills.c.job_id).filter(
+            job_skills.c.skill_id == skill_id
+        )
+    ]
+    db.flush()
+    refresh_job_search_vectors(db, job_ids)
+
     db.commit()
-    db.close()
+
+    rename_suggestion("skill", old_name, new_name)
 
     return jsonify({"message": "Skill updated successfully"}), 200
 
@@ -317,12 +335,11 @@ def update_skill(skill_id):
 # 10. GET /admin/categories → List all categories
 # ============================================================
 def get_all_categories():
-    db = SessionLocal()
+    db = get_db()
     categories = db.query(Category).all()
 
     data = [{"id": c.id, "name": c.name} for c in categories]
 
-    db.close()
     return jsonify(data), 200
 
 
@@ -330,7 +347,7 @@ def get_all_categories():
 # 11. POST /admin/categories → add new category
 # ============================================================
 def add_category():
-    db = SessionLocal()
+    db = get_db()
 
     data = request.get_json()
     name = data.get("name")
@@ -352,7 +369,8 @@ def add_category():
         return jsonify({"error": "Category already exists"}), 400
 
     db.refresh(new_category)
-    db.close()
+
+    add_suggestion("category", new_category.name)
 
     return jsonify({"id": new_category.id, "name": new_category.name})
 
@@ -361,23 +379,23 @@ def add_category():
 # 12. DELETE /admin/categories/<id>
 # ============================================================
 def delete_category(category_id):
-    db = SessionLocal()
+    db = get_db()
 
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
-        db.close()
         return jsonify({"error": "Category not found"}), 404
 
     jobs_count = db.query(Job).filter(Job.category_id == category_id).count()
     if jobs_count > 0:
-        db.close()
         return jsonify({
             "error": "Category has jobs assigned. Remove or reassign them first."
         }), 400
 
+    category_name = category.name
     db.delete(category)
     db.commit()
-    db.close()
+
+    remove_suggestion("category", category_name)
 
     return jsonify({"message": "Category deleted successfully"}), 200
 
@@ -387,23 +405,32 @@ def delete_category(category_id):
 # 13. PUT /admin/categories/<id> → Update category name
 # ============================================================
 def update_category(category_id):
-    db = SessionLocal()
+    db = get_db()
     category = db.query(Category).filter(Category.id == category_id).first()
 
     if not category:
-        db.close()
         return jsonify({"error": "Category not found"}), 404
 
     data = request.get_json()
     new_name = data.get("name")
 
     if not new_name:
-        db.close()
         return jsonify({"error": "Missing field: name"}), 400
 
+    old_name = category.name
     category.name = new_name
+
+    # Keep the full-text index of jobs in this category in sync
+    job_ids = [
+        job_id
+        for (job_id,) in db.query(Job.id).filter(Job.category_id == category_id)
+    ]
+    db.flush()
+    refresh_job_search_vectors(db, job_ids)
+
     db.commit()
-    db.close()
+
+    rename_suggestion("category", old_name, new_name)
 
     return jsonify({"message": "Category updated successfully"}), 200
 
@@ -412,21 +439,10 @@ def update_category(category_id):
 # 14. GET /admin/admins → List all admins
 # ============================================================
 def getAdmins():
-    db = SessionLocal()
+    db = get_db()
 
-    # Extract token manually to get current admin ID
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Token missing"}), 401
-
-    token = auth_header.split(" ")[1]
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-    except jwt.InvalidTokenError:
-        return jsonify({"error": "Invalid token"}), 401
-
-    current_admin_id = payload.get("id")
+    # admin_required already verified the token
+    current_admin_id = request.user_id
 
     # Fetch all admins except the current one
     admins = (
@@ -443,7 +459,6 @@ def getAdmins():
         for u in admins
     ]
 
-    db.close()
     return jsonify(data), 200
 
 
@@ -460,7 +475,7 @@ def create_admin():
     if not full_name or not email or not password:
         return jsonify({"error": "full_name, email, and password are required"}), 400
 
-    db = SessionLocal()
+    db = get_db()
 
     try:
         existing = db.query(User).filter(User.email == email).first()
@@ -470,7 +485,7 @@ def create_admin():
         new_admin = User(
             full_name=full_name,
             email=email,
-            password=generate_password_hash(password),
+            password=hash_password(password),
             role="admin",
         )
 
@@ -497,8 +512,6 @@ def create_admin():
         db.rollback()
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        db.close()
 
 
 # ============================================================
@@ -508,7 +521,7 @@ def delete_admin(admin_id, current_user=None):
     if current_user and current_user.id == admin_id:
         return jsonify({"error": "You cannot delete your own admin account"}), 400
 
-    db = SessionLocal()
+    db = get_db()
     try:
         admin = (
             db.query(User)
@@ -552,6 +565,7 @@ def delete_admin(admin_id, current_user=None):
 
         db.delete(admin)
         db.commit()
+        invalidate_principal(admin_id)
 
         return jsonify(
             {"message": f"Admin {admin_id} deleted successfully"}
@@ -561,15 +575,13 @@ def delete_admin(admin_id, current_user=None):
         db.rollback()
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        db.close()
 
 
 # ============================================================
 # 17. GET /admin/deletion-requests → Get all deletion requests
 # ============================================================
 def get_all_delete_requests():
-    db = SessionLocal()
+    db = get_db()
     try:
         requests = db.query(DeleteRequest).all()
 
@@ -592,8 +604,6 @@ def get_all_delete_requests():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        db.close()
 
 
 
@@ -601,7 +611,7 @@ def get_all_delete_requests():
 # 18. GET /admin/reported-jobs → Get all reported jobs
 # ============================================================
 def get_reported_jobs():
-    db = SessionLocal()
+    db = get_db()
     try:
         reported_jobs = db.query(ReportedJob).options(
             joinedload(ReportedJob.user),
@@ -632,8 +642,6 @@ def get_reported_jobs():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        db.close()
 
 
 
@@ -641,142 +649,119 @@ def get_reported_jobs():
 # 18. GET /admin/stats → Get dashboard stats
 # ============================================================
 def get_dashboard_data(days: int = 90):
-    db = SessionLocal()
+    """
+    Users / jobs / applications over time.
+    Query params: bucket=day|week|month, start/end=YYYY-MM-DD,
+    days=N (range length when start is omitted, default 90)
+    """
+    db = get_db()
     try:
-        today = datetime.today()
-        start_date = today - timedelta(days=days)
-
-        chart_data = []
-
-        for i in range(days + 1):
-            day = start_date + timedelta(days=i)
-            day_start = datetime(day.year, day.month, day.day)
-            day_end = day_start + timedelta(days=1)
-
-            users_count = db.query(User).filter(
-                User.created_at >= day_start,
-                User.created_at < day_end
-            ).count()
-
-            jobs_count = db.query(Job).filter(
-                Job.created_at >= day_start,
-                Job.created_at < day_end
-            ).count()
-
-            applicants_count = db.query(Application).filter(
-                Application.applied_at >= day_start,
-                Application.applied_at < day_end
-            ).count()
-
-            chart_data.append({
-                "date": day_start.isoformat(),
-                "users": users_count,
-                "jobs": jobs_count,
-                "applicants": applicants_count
-            })
+        bucket = request.args.get("bucket", "day")
+        end = request.args.get("end")
+        start = request.args.get("start")
+        days = int(request.args.get("days", days))
+
+        end = datetime.fromisoformat(end) if end else datetime.today()
+        start = datetime.fromisoformat(start) if start else end - timedelta(days=days)
+
+        chart_data = time_series(db, bucket, start, end)
 
         return jsonify(chart_data), 200
-    finally:
-        db.close()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 
 # ============================================================
 # 19. GET /admin/user-roles → Get pie chart user-roles
 # ============================================================
 def user_roles_chart():
-    db = SessionLocal()
-    try:
-        results = db.query(User.role, func.count(User.id)).group_by(User.role).all()
+    db = get_db()
+    results = rollup_totals(db, "users").items()
 
-        chart_data = []
-        color_map = {
-            "admin": "var(--color-admin)",
-            "employer": "var(--color-employer)",
-            "candidate": "var(--color-candidate)",
-        }
+    chart_data = []
+    color_map = {
+        "admin": "var(--color-admin)",
+        "employer": "var(--color-employer)",
+        "candidate": "var(--color-candidate)",
+    }
 
-        for role, count in results:
-            chart_data.append({
-                "browser": role,  # reuse "browser" key for pie chart nameKey
-                "visitors": count,
-                "fill": color_map.get(role, "var(--color-other)")
-            })
+    for role, count in results:
+        chart_data.append({
+            "browser": role,  # reuse "browser" key for pie chart nameKey
+            "visitors": count,
+            "fill": color_map.get(role, "var(--color-other)")
+        })
 
-        return jsonify(chart_data)
-    finally:
-        db.close()
+    return jsonify(chart_data)
 
 
 # ============================================================
 # 20. GET /admin/delete-requests-chart → Get pie chart user-roles
 # ============================================================
 def delete_requests_chart():
-    db = SessionLocal()
-    try:
-        today = datetime.today()
-        # Start date: 6 months ago
-        start_date = today - timedelta(days=180)
-
-        # Group by month
-        results = db.query(
-            func.date_trunc('month', DeleteRequest.created_at).label('month'),
-            func.count(DeleteRequest.id)
-        ).filter(
-            DeleteRequest.created_at >= start_date
-        ).group_by('month').order_by('month').all()
-
-        # Format data for chart
-        chart_data = []
-        for month, count in results:
-            chart_data.append({
-                "month": month.strftime("%Y-%m"),
-                "requests": count,
-                "fill": "var(--color-delete)"
-            })
+    db = get_db()
+    today = datetime.today()
+    # Start date: 6 months ago
+    start_date = today - timedelta(days=180)
 
-        return jsonify(chart_data), 200
-    finally:
-        db.close()
+    # Group by month
+    results = rollup_monthly(db, "delete_requests", start_date.date())
+
+    # Format data for chart
+    chart_data = []
+    for month, count in results:
+        chart_data.append({
+            "month": month.strftime("%Y-%m"),
+            "requests": count,
+            "fill": "var(--color-delete)"
+        })
+
+    return jsonify(chart_data), 200
 
 
 # ============================================================
 # 21. GET /admin/jobs-per-category → Get pie chart jobs per category
 # ============================================================
 def jobs_per_category_chart():
-    db = SessionLocal()
-    try:
-        results = (
-            db.query(Category.name, func.count(Job.id))
-            .join(Job, Job.category_id == Category.id)
-            .group_by(Category.id)
-            .order_by(func.count(Job.id).desc())
-            .limit(8)
-            .all()
-        )
-
-        # Format data for chart
-        chart_data = []
-        colors = [
-            "var(--chart-1)",
-            "var(--chart-2)",
-            "var(--chart-3)",
-            "var(--chart-4)",
-            "var(--chart-5)",
-            "var(--chart-6)",
-            "var(--chart-7)",
-            "var(--chart-8)",
-        ]
+    db = get_db()
+    totals = rollup_totals(db, "jobs")
+    category_ids = [int(dimension) for dimension in totals if dimension]
+    names = dict(
+        db.query(Category.id, Category.name)
+        .filter(Category.id.in_(category_ids))
+        .all()
+    )
+    results = sorted(
+        (
+            (names[category_id], totals[str(category_id)])
+            for category_id in category_ids
+            if category_id in names
+        ),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:8]
+
+    # Format data for chart
+    chart_data = []
+    colors = [
+        "var(--chart-1)",
+        "var(--chart-2)",
+        "var(--chart-3)",
+        "var(--chart-4)",
+        "var(--chart-5)",
+        "var(--chart-6)",
+        "var(--chart-7)",
+        "var(--chart-8)",
+    ]
 
-        for index, (name, count) in enumerate(results):
-            chart_data.append({
-                "category": name,
-                "jobs": count,
-                "fill": colors[index % len(colors)]
-            })
+    for index, (name, count) in enumerate(results):
+        chart_data.append({
+            "category": name,
+            "jobs": count,
+            "fill": colors[index % len(colors)]
+        })
 
-        return jsonify(chart_data), 200
-    finally:
-        db.close()
+    return jsonify(chart_data), 200
 
 
 
@@ -784,34 +769,34 @@ def jobs_per_category_chart():
 # 22. GET /admin/app-status-chart → Get applications status chart
 # ============================================================
 def application_status_chart():
-    db = SessionLocal()
-    try:
-        # Group applications by status
-        results = (
-            db.query(Application.status, func.count(Application.id))
-            .group_by(Application.status)
-            .all()
-        )
-
-        # Map colors for each status
-        status_colors = {
-            "pending": "var(--chart-1)",
-            "reviewed": "var(--chart-2)",
-            "accepted": "var(--chart-3)",
-            "rejected": "var(--chart-4)",
-            "other": "var(--chart-5)"
+    db = get_db()
+    # Group applications by status
+    results = rollup_totals(db, "applications").items()
+
+    # Map colors for each status
+    status_colors = {
+        "pending": "var(--chart-1)",
+        "reviewed": "var(--chart-2)",
+        "accepted": "var(--chart-3)",
+        "rejected": "var(--chart-4)",
+        "other": "var(--chart-5)"
+    }
+
+    # Format data for pie chart
+    chart_data = [
+        {
+            "status": status,
+            "count": count,
+            "fill": status_colors.get(status, status_colors["other"])
         }
+        for status, count in results
+    ]
 
-        # Format data for pie chart
-        chart_data = [
-            {
-                "status": status,
-                "count": count,
-                "fill": status_colors.get(status, status_colors["other"])
-            }
-            for status, count in results
-        ]
+    return jsonify(chart_data), 200
 
-        return jsonify(chart_data), 200
-    finally:
-        db.close()
\ No newline at end of file
+
+# ============================================================
+# 23. GET /admin/db-pool → Connection pool metrics
+# ============================================================
+def db_pool_metrics():
+    return jsonify(pool_metrics()), 200
@@ -1,24 +1,16 @@
 from flask import request, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
 from sqlalchemy.orm import Session
-from config.db import SessionLocal
+from config.db import get_db
 from core.models import Application, Job, User
 from typing import Optional
 import os
 from datetime import datetime
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def get_all_applications():
     """Get all applications (for employers)"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         job_id = request.args.get("job_id")
@@ -73,13 +65,11 @@ def get_all_applications():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def get_application(application_id: int):
     """Get a single application by ID"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         app = db.query(Application).filter(Application.id == application_id).first()
@@ -129,13 +119,11 @@ def get_application(application_id: int):
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def update_application(application_id: int):
     """Update application status"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         app = db.query(Application).filter(Application.id == application_id).first()
@@ -181,5 +169,3 @@ def update_application(application_id: int):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
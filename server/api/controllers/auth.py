@@ -1,17 +1,16 @@
 from flask import request, jsonify, redirect, session
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-import jwt
 from dotenv import load_dotenv
-from config.db import SessionLocal
+from config.db import get_db
 from core.models import User, DeleteRequest
 from google_auth_oauthlib.flow import Flow
 import os
 import requests
-from middlewares.auth import is_auth
+from middlewares.auth import is_auth, encode_token
+from services.principal_service import invalidate_principal
+from services.password_service import hash_password, verify_password, needs_rehash
 
 load_dotenv()
-SECRET_KEY = os.getenv("JWT_SECRET")
 
 # Allow insecure transport for local development (HTTP instead of HTTPS)
 # Only enable in development environment, never in production
@@ -22,7 +21,6 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GITHUB_CLIENT_ID = os.getenv("GITHUB_CLIENT_ID")
 GITHUB_CLIENT_SECRET = os.getenv("GITHUB_CLIENT_SECRET")
-JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
 GOOGLE_REDIRECT_URI = os.getenv(
     "GOOGLE_REDIRECT_URI", "http://localhost:3000/api/auth/google/callback"
 )
@@ -31,14 +29,6 @@ GITHUB_REDIRECT_URI = os.getenv(
 )
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def google_login():
     # Ensure redirect URI is set (must point to Next.js frontend, not Flask backend)
     redirect_uri = (
@@ -104,64 +94,53 @@ def google_callback():
     name = user_info.get("name", "")
     picture = user_info.get("picture", "")
 
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.email == email).first()
+    db = get_db()
+    user = db.query(User).filter(User.email == email).first()
 
-        if not user:
-            user = User(
-                full_name=name,
-                email=email,
-                password=None,
-                role="candidate",
-                image=picture,
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        else:
-            user.image = picture
-            db.commit()
-
-        token = jwt.encode(
-            {"id": user.id, "exp": datetime.utcnow() + timedelta(hours=24)},
-            JWT_SECRET,
-            algorithm="HS256",
+    if not user:
+        user = User(
+            full_name=name,
+            email=email,
+            password=None,
+            role="candidate",
+            image=picture,
         )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    else:
+        user.image = picture
+        db.commit()
+        invalidate_principal(user.id)
 
-        return (
-            jsonify(
-                {
-                    "token": token,
-                    "user": {
-                        "id": user.id,
-                        "email": user.email,
-                        "full_name": user.full_name,
-                        "image": user.image,
-                        "role": user.role,
-                    },
-                }
-            ),
-            200,
-        )
+    token = encode_token(
+        {"id": user.id, "exp": datetime.utcnow() + timedelta(hours=24)}
+    )
+
+    return (
+        jsonify(
+            {
+                "token": token,
+                "user": {
+                    "id": user.id,
+                    "email": user.email,
+                    "full_name": user.full_name,
+                    "image": user.image,
+                    "role": user.role,
+                },
+            }
+        ),
+        200,
+    )
 
-    finally:
-        db.close()
 
 
+@is_auth
 def get_current_user():
-    auth = request.headers.get("Authorization")
-    print(auth)
-    if not auth or not auth.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    token = auth.split(" ")[1]
-    db = SessionLocal()
+    db = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        print(decoded)
-        user = db.query(User).get(decoded["id"])
+        user = db.query(User).get(request.user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -183,14 +162,8 @@ def get_current_user():
             }
         )
 
-    except jwt.ExpiredSignatureError:
-        print("expired")
-        return jsonify({"error": "Token expired"}), 401
-    except Exception:
-        print("invalid")
-        return jsonify({"error": "Invalid token"}), 401
-    finally:
-        db.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 def logout():
@@ -208,93 +181,88 @@ def signup():
     if not name or not email or not password:
         return jsonify({"error": "Missing fields"}), 400
 
-    db = SessionLocal()
-    try:
-        if db.query(User).filter_by(email=email).first():
-            return jsonify({"error": "Email already exists"}), 400
+    db = get_db()
+    if db.query(User).filter_by(email=email).first():
+        return jsonify({"error": "Email already exists"}), 400
 
-        password_hash = generate_password_hash(password)
-        new_user = User(
-            full_name=name, email=email, password=password_hash, role=role, image=None
-        )
+    password_hash = hash_password(password)
+    new_user = User(
+        full_name=name, email=email, password=password_hash, role=role, image=None
+    )
 
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
 
-        token = jwt.encode(
-            {"id": new_user.id, "exp": datetime.utcnow() + timedelta(hours=24)},
-            JWT_SECRET,
-            algorithm="HS256",
-        )
+    token = encode_token(
+        {"id": new_user.id, "exp": datetime.utcnow() + timedelta(hours=24)}
+    )
 
-        return jsonify(
-            {
-                "token": token,
-                "user": {
-                    "id": new_user.id,
-                    "full_name": new_user.full_name,
-                    "email": new_user.email,
-                    "role": new_user.role,
-                    "image": new_user.image,
-                },
-            }
-        )
-    finally:
-        db.close()
+    return jsonify(
+        {
+            "token": token,
+            "user": {
+                "id": new_user.id,
+                "full_name": new_user.full_name,
+                "email": new_user.email,
+                "role": new_user.role,
+                "image": new_user.image,
+            },
+        }
+    )
 
 
 def login():
     data = request.json
     email = data.get("email")
     password = data.get("password")
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter_by(email=email).first()
-        # Check if user exists and has a password (OAuth users don't have passwords)
-        if not user:
-            return jsonify({"error": "Invalid email or password"}), 400
-
-        # If user has no password, they likely signed up via OAuth
-        if not user.password:
-            return (
-                jsonify(
-                    {
-                        "error": "This account was created with Google. Please use Google Sign In."
-                    }
-                ),
-                400,
-            )
-
-        # Verify password hash
-        if not check_password_hash(user.password, password):
-            return jsonify({"error": "Invalid email or password"}), 400
-
-        token = jwt.encode(
-            {"id": user.id,"role": user.role, "exp": datetime.utcnow() + timedelta(hours=24)},
-            JWT_SECRET,
-            algorithm="HS256",
+    db = get_db()
+    user = db.query(User).filter_by(email=email).first()
+    # Check if user exists and has a password (OAuth users don't have passwords)
+    if not user:
+        return jsonify({"error": "Invalid email or password"}), 400
+
+    # If user has no password, they likely signed up via OAuth
+    if not user.password:
+        return (
+            jsonify(
+                {
+                    "error": "This account was created with Google. Please use Google Sign In."
+                }
+            ),
+            400,
         )
 
-        return jsonify(
-            {
-                "token": token,
-                "user": {
-                    "id": user.id,
-                    "full_name": user.full_name,
-                    "email": user.email,
-                    "role": user.role,
-                    "image": user.image,
-                },
-            }
-        )
-    finally:
-        db.close()
+    # Verify password hash
+    if not verify_password(user.password, password):
+        return jsonify({"error": "Invalid email or password"}), 400
+
+    # Upgrade hashes made with an older method or cost
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+        db.commit()
+
+    token = encode_token(
+        {"id": user.id,"role": user.role, "exp": datetime.utcnow() + timedelta(hours=24)}
+    )
+
+    return jsonify(
+        {
+            "token": token,
+            "user": {
+                "id": user.id,
+                "full_name": user.full_name,
+                "email": user.email,
+                "role": user.role,
+                "image": user.image,
+            },
+        }
+    )
 
 
 @is_auth
 def update_password():
-    db = SessionLocal()  #
+    db = get_db()  #
     
     try:
         data = request.get_json()
@@ -314,10 +282,10 @@ def update_password():
         if not user:
             return jsonify({"message": "User not found."}), 404
 
-        if not check_password_hash(user.password, current_password):
+        if not verify_password(user.password, current_password):
             return jsonify({"message": "Current password is incorrect."}), 400
 
-        user.password = generate_password_hash(new_password)
+        user.password = hash_password(new_password)
         db.commit()
 
         return jsonify({"message": "Password updated successfully!"}), 200
@@ -325,8 +293,6 @@ def update_password():
     except Exception as e:
         db.rollback()
         return jsonify({"message": str(e)}), 500
-    finally:
-        db.close()
 
 
 @is_auth
@@ -334,7 +300,7 @@ def delete_account_request():
     """
     Receives a delete account request with a reason.
     """
-    db = SessionLocal()
+    db = get_db()
     try:
         data = request.get_json()
         reason = data.get("reason")
@@ -353,5 +319,3 @@ def delete_account_request():
     except Exception as e:
         db.rollback()
         return jsonify({"message": str(e)}), 500
-    finally:
-        db.close()
@@ -1,26 +1,40 @@
 from flask import request, jsonify
-from werkzeug.utils import secure_filename
 from sqlalchemy.orm import Session
-from config.db import SessionLocal
-from core.models import User, SavedJob, Education, Experience, Skill, user_skills
-import os
+from config.db import get_db
+from core.models import (
+    User,
+    Application,
+    SavedJob,
+    Education,
+    Experience,
+    Skill,
+    user_skills,
+)
 from datetime import datetime
 from middlewares.auth import is_auth 
 from sqlalchemy import select
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from services.autocomplete_service import (
+    add_suggestion,
+    remove_suggestion,
+    rename_suggestion,
+)
+from services.recommendation_service import invalidate_user_recommendations
+from services.people_service import sample_people
+from services.principal_service import invalidate_principal
+from werkzeug.exceptions import HTTPException
+from services.upload_service import (
+    UploadError,
+    delete_upload,
+    save_document,
+    save_image,
+)
 
 
 
 # Unified public user endpoint (read‑only, no auth)
 def get_public_user(user_id: int):
     """Return public profile for any user (candidate or employer)."""
-    db = next(get_db())
+    db = get_db()
     try:
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
@@ -72,13 +86,11 @@ def get_public_user(user_id: int):
         return jsonify(response), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 @is_auth
 def get_candidate_career():
-    db = next(get_db())
+    db = get_db()
 
     try:
         user = (
@@ -133,14 +145,12 @@ def get_candidate_career():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 @is_auth
 def update_candidate():
     """Update candidate profile"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user = (
@@ -153,6 +163,7 @@ def update_candidate():
             return jsonify({"error": "Candidate not found"}), 404
 
         data = request.get_json()
+        old_company_name = user.companyName
 
         # Update basic fields
         if "full_name" in data:
@@ -187,6 +198,11 @@ def update_candidate():
 
         db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
+
+        rename_suggestion("company", old_company_name, user.companyName)
+        # location feeds the recommendation score
+        invalidate_user_recommendations(user.id)
 
         return (
             jsonify(
@@ -209,13 +225,11 @@ def update_candidate():
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def upload_cv(candidate_id: int):
     """Upload CV file for candidate"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user = (
@@ -235,33 +249,31 @@ def upload_cv(candidate_id: int):
         if file.filename == "":
             return jsonify({"error": "No file selected"}), 400
 
-        # Check file extension
-        allowed_extensions = {"pdf", "doc", "docx"}
-        file_ext = (
-            file.filename.rsplit(".", 1)[1].lower() if "." in file.filename else ""
-        )
+        # Type is checked from the content, then the file is stored under a
+        # new name, so a failed update leaves the current CV untouched
+        old_resume_url = user.resume_url
+        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+        resume_url = save_document(file, "cvs", f"cv_{candidate_id}_{timestamp}")
 
-        if file_ext not in allowed_extensions:
-            return (
-                jsonify({"error": "Invalid file type. Only PDF, DOC, DOCX allowed."}),
-                400,
+        try:
+            user.resume_url = resume_url
+            db.commit()
+        except Exception:
+            delete_upload(resume_url)
+            raise
+
+        # Applications sent with the previous CV keep pointing at it
+        if old_resume_url and old_resume_url != resume_url:
+            still_used = (
+                db.query(Application.id)
+                .filter(
+                    Application.user_id == candidate_id,
+                    Application.resume_url == old_resume_url,
+                )
+                .first()
             )
-
-        # Create uploads directory if it doesn't exist
-        upload_dir = "uploads/cvs"
-        os.makedirs(upload_dir, exist_ok=True)
-
-        # Generate filename
-        filename = f"cv_{candidate_id}.{file_ext}"
-        filepath = os.path.join(upload_dir, filename)
-
-        # Save file
-        file.save(filepath)
-
-        # Update user's resume_url
-        resume_url = f"/uploads/cvs/{filename}"
-        user.resume_url = resume_url
-        db.commit()
+            if not still_used:
+                delete_upload(old_resume_url)
 
         return (
             jsonify(
@@ -274,16 +286,19 @@ def upload_cv(candidate_id: int):
             200,
         )
 
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+    except HTTPException:
+        # e.g. 413 from MAX_CONTENT_LENGTH, answered by its error handler
+        raise
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def upload_profile_image(candidate_id: int):
     """Upload profile image for candidate"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user = (
@@ -302,36 +317,39 @@ def upload_profile_image(candidate_id: int):
         if file.filename == "":
             return jsonify({"error": "No file selected"}), 400
 
-        filename = secure_filename(file.filename)
-        ext = filename.rsplit(".", 1)[-1].lower()
-        if ext not in ["png", "jpg", "jpeg", "webp"]:
-            return jsonify({"error": "Invalid file type"}), 400
-
-        upload_dir = os.path.join(os.getcwd(), "uploads", "profile")
-        os.makedirs(upload_dir, exist_ok=True)
-
+        old_image_url = user.image
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-        saved_name = f"user_{candidate_id}_{timestamp}.{ext}"
-        save_path = os.path.join(upload_dir, saved_name)
-        file.save(save_path)
+        image_url = save_image(
+            file, "profile", f"user_{candidate_id}_{timestamp}"
+        )
+
+        try:
+            user.image = image_url
+            db.commit()
+        except Exception:
+            delete_upload(image_url)
+            raise
+        if old_image_url != image_url:
+            delete_upload(old_image_url)
 
-        image_url = f"/uploads/profile/{saved_name}"
-        user.image = image_url
-        db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
 
         return jsonify({"image": image_url}), 200
 
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+    except HTTPException:
+        # e.g. 413 from MAX_CONTENT_LENGTH, answered by its error handler
+        raise
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def get_saved_jobs(candidate_id: int):
     """Get all saved jobs for a candidate"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user = (
@@ -388,8 +406,6 @@ def get_saved_jobs(candidate_id: int):
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
@@ -397,7 +413,7 @@ def get_saved_jobs(candidate_id: int):
 # career tab
 @is_auth
 def add_education():
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -435,15 +451,13 @@ def add_education():
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
 
 @is_auth
 def update_education(education_id):
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -479,14 +493,12 @@ def update_education(education_id):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
 @is_auth
 def delete_education(education_id):
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -508,8 +520,6 @@ def delete_education(education_id):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
@@ -517,7 +527,7 @@ def delete_education(education_id):
 
 @is_auth
 def add_experience():
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -552,15 +562,13 @@ def add_experience():
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
 
 @is_auth
 def update_experience(experience_id):
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -594,15 +602,13 @@ def update_experience(experience_id):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
 
 @is_auth
 def delete_experience(experience_id):
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -624,14 +630,12 @@ def delete_experience(experience_id):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
 @is_auth
 def get_skills():
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         # Get query param, e.g., /api/skills?query=python
@@ -650,13 +654,11 @@ def get_skills():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 @is_auth
 def add_skill():
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -677,6 +679,7 @@ def add_skill():
             db.add(skill)
             db.commit()
             db.refresh(skill)
+            add_suggestion("skill", skill.name)
 
         user = db.query(User).filter(User.id == user_id).first()
 
@@ -687,6 +690,7 @@ def add_skill():
 
         user.skills.append(skill)
         db.commit()
+        invalidate_user_recommendations(user_id)
 
         return jsonify({
             "message": "Skill added successfully",
@@ -699,14 +703,12 @@ def add_skill():
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 
 @is_auth
 def delete_skill(skill_id):
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -720,79 +722,37 @@ def delete_skill(skill_id):
         if skill in user.skills:
             user.skills.remove(skill)
             db.commit()
+            invalidate_user_recommendations(user_id)
 
         # Check if any other users have this skill
         stmt = select(user_skills).where(user_skills.c.skill_id == skill.id)
         result = db.execute(stmt).all()
         if len(result) == 0:
+            skill_name = skill.name
             db.delete(skill)
             db.commit()
+            remove_suggestion("skill", skill_name)
 
         return jsonify({"message": "Skill removed successfully"}), 200
 
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
+@is_auth
 def get_random_candidates():
     """Get 5 random candidates who are not the current user and not already connected"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    import jwt
-    import os
-    from sqlalchemy.sql import func
-    from core.models import ConnectionRequest
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
-
-        subquery = (
-            db.query(ConnectionRequest.receiver_id)
-            .filter(ConnectionRequest.sender_id == current_user_id)
-            .union(
-                db.query(ConnectionRequest.sender_id).filter(
-                    ConnectionRequest.receiver_id == current_user_id
-                )
-            )
-        )
+        current_user_id = request.user_id
 
-        candidates = (
-            db.query(User)
-            .filter(
-                User.role == "candidate",
-                User.id != current_user_id,
-                ~User.id.in_(subquery),
-            )
-            .order_by(func.random())
-            .all()
-        )
-
-        # Shuffle and pick 5 in python to avoid some func.random() issues or if all() is preferred
-        # Actually func.random() is fine for sqlite/postgresql.
-        # Fixed: candidates = candidates[:5] if logic above didn't limit
-        
-        # Let's use the limit in query as before
-        candidates = (
-            db.query(User)
-            .filter(
-                User.role == "candidate",
-                User.id != current_user_id,
-                ~User.id.in_(subquery),
-            )
-            .order_by(func.random())
-            .limit(5)
-            .all()
+        candidates = sample_people(
+            db,
+            current_user_id,
+            "candidate",
+            rank_by_skills=request.args.get("rank") == "skills",
         )
 
         return (
@@ -811,9 +771,5 @@ def get_random_candidates():
             200,
         )
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
\ No newline at end of file
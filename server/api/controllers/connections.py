@@ -1,38 +1,23 @@
 from flask import request, jsonify
 from sqlalchemy.orm import Session
-from config.db import SessionLocal
-from core.models import User, ConnectionRequest, Notification
-import jwt
-import os
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from config.db import get_db
+from core.models import ConnectionRequest, Notification
+from services.notification_service import publish_after_commit
+from middlewares.auth import is_auth, current_principal
 
 
+@is_auth
 def send_request():
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
     data = request.json
     receiver_id = data.get("receiver_id")
 
     if not receiver_id:
         return jsonify({"error": "Missing receiver_id"}), 400
 
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        sender_id = decoded["id"]
+        sender_id = request.user_id
 
         if sender_id == receiver_id:
             return jsonify({"error": "Cannot connect with yourself"}), 400
@@ -60,7 +45,7 @@ def send_request():
         )
         db.add(new_request)
 
-        sender = db.query(User).get(sender_id)
+        sender = current_principal()
         notification = Notification(
             sender_id=sender_id,
             receiver_id=receiver_id,
@@ -70,34 +55,24 @@ def send_request():
             is_read=0,
         )
         db.add(notification)
+        publish_after_commit(db, notification)
 
         db.commit()
 
         return jsonify({"message": "Connection request sent successfully"}), 201
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
+@is_auth
 def get_requests():
     """Get all connection requests for the current user"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
+        current_user_id = request.user_id
 
         received = (
             db.query(ConnectionRequest)
@@ -149,28 +124,17 @@ def get_requests():
             200,
         )
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
+@is_auth
 def accept_request(request_id: int):
     """Accept a connection request"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
+        current_user_id = request.user_id
 
         req = (
             db.query(ConnectionRequest)
@@ -189,7 +153,7 @@ def accept_request(request_id: int):
 
         req.status = "accepted"
 
-        receiver = db.query(User).get(current_user_id)
+        receiver = current_principal()
         notification = Notification(
             sender_id=current_user_id,
             receiver_id=req.sender_id,
@@ -199,33 +163,23 @@ def accept_request(request_id: int):
             is_read=0,
         )
         db.add(notification)
+        publish_after_commit(db, notification)
 
         db.commit()
         return jsonify({"message": "Connection accepted"}), 200
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
+@is_auth
 def reject_request(request_id: int):
     """Reject a connection request"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
+        current_user_id = request.user_id
 
         req = (
             db.query(ConnectionRequest)
@@ -246,29 +200,18 @@ def reject_request(request_id: int):
         db.commit()
         return jsonify({"message": "Connection rejected"}), 200
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
+@is_auth
 def get_connections():
     """Get all established connections (accepted requests) for the current user"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
+        current_user_id = request.user_id
 
         connections = (
             db.query(ConnectionRequest)
@@ -310,28 +253,17 @@ def get_connections():
 
         return jsonify(connection_list), 200
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
+@is_auth
 def remove_connection(connection_id: int):
     """Remove an established connection"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
+        current_user_id = request.user_id
 
         conn = (
             db.query(ConnectionRequest)
@@ -352,10 +284,6 @@ def remove_connection(connection_id: int):
         db.commit()
         return jsonify({"message": "Connection removed successfully"}), 200
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
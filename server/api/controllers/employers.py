@@ -1,23 +1,19 @@
 from flask import request, jsonify
-from werkzeug.utils import secure_filename
-import os
 from datetime import datetime
 from sqlalchemy.orm import Session
-from config.db import SessionLocal
+from config.db import get_db
 from core.models import User
 from middlewares.auth import is_auth
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from services.autocomplete_service import rename_suggestion
+from services.people_service import sample_people
+from services.principal_service import invalidate_principal
+from werkzeug.exceptions import HTTPException
+from services.upload_service import UploadError, delete_upload, save_image
 
 
 def get_employer(employer_id: int):
     """Get employer profile"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user = (
@@ -56,14 +52,12 @@ def get_employer(employer_id: int):
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 @is_auth
 def update_employer():
     """Update employer profile"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user = (
@@ -76,6 +70,7 @@ def update_employer():
             return jsonify({"error": "Employer not found"}), 404
 
         data = request.get_json(silent=True) or {}
+        old_company_name = user.companyName
 
         if "full_name" in data:
             user.full_name = data["full_name"]
@@ -103,6 +98,9 @@ def update_employer():
 
         db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
+
+        rename_suggestion("company", old_company_name, user.companyName)
 
         return (
             jsonify(
@@ -125,13 +123,11 @@ def update_employer():
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def upload_profile_image(employer_id: int):
     """Upload profile image for employer"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user = (
@@ -150,73 +146,47 @@ def upload_profile_image(employer_id: int):
         if file.filename == "":
             return jsonify({"error": "No file selected"}), 400
 
-        filename = secure_filename(file.filename)
-        ext = filename.rsplit(".", 1)[-1].lower()
-        if ext not in ["png", "jpg", "jpeg", "webp"]:
-            return jsonify({"error": "Invalid file type"}), 400
-
-        upload_dir = os.path.join(os.getcwd(), "uploads", "profile")
-        os.makedirs(upload_dir, exist_ok=True)
-
+        old_image_url = user.image
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-        saved_name = f"user_{employer_id}_{timestamp}.{ext}"
-        save_path = os.path.join(upload_dir, saved_name)
-        file.save(save_path)
+        image_url = save_image(file, "profile", f"user_{employer_id}_{timestamp}")
+
+        try:
+            user.image = image_url
+            db.commit()
+        except Exception:
+            delete_upload(image_url)
+            raise
+        if old_image_url != image_url:
+            delete_upload(old_image_url)
 
-        image_url = f"/uploads/profile/{saved_name}"
-        user.image = image_url
-        db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
 
         return jsonify({"image": image_url}), 200
 
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+    except HTTPException:
+        # e.g. 413 from MAX_CONTENT_LENGTH, answered by its error handler
+        raise
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
+@is_auth
 def get_random_employers():
     """Get 5 random employers who are not the current user and not already connected"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
-
-    import jwt
-    import os
-    from sqlalchemy.sql import func
-    from core.models import ConnectionRequest
-
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
-
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
-
-        subquery = (
-            db.query(ConnectionRequest.receiver_id)
-            .filter(ConnectionRequest.sender_id == current_user_id)
-            .union(
-                db.query(ConnectionRequest.sender_id).filter(
-                    ConnectionRequest.receiver_id == current_user_id
-                )
-            )
-        )
+        current_user_id = request.user_id
 
-        employers = (
-            db.query(User)
-            .filter(
-                User.role == "employer",
-                User.id != current_user_id,
-                ~User.id.in_(subquery),
-            )
-            .order_by(func.random())
-            .limit(5)
-            .all()
+        employers = sample_people(
+            db,
+            current_user_id,
+            "employer",
+            rank_by_skills=request.args.get("rank") == "skills",
         )
 
         return (
@@ -235,9 +205,5 @@ def get_random_employers():
             200,
         )
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
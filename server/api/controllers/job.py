@@ -1,8 +1,8 @@
+import uuid
 from flask import request, jsonify, send_from_directory
-from werkzeug.utils import secure_filename
-from sqlalchemy import or_, and_
-from sqlalchemy.orm import Session
-from config.db import SessionLocal
+from sqlalchemy import or_, and_, false
+from sqlalchemy.orm import Session, joinedload, selectinload
+from config.db import get_db
 from core.models import (
     Job,
     User,
@@ -13,28 +13,42 @@ from core.models import (
     Notification,
     Report,
 )
-from controllers.utils import get_user_id_from_token
+from controllers.utils import (
+    get_user_id_from_token,
+    paginate,
+    encode_cursor,
+    decode_cursor,
+)
+from services.search_service import job_search_clause, refresh_job_search_vectors
+from services.applications_service import link_applicant
+from services.notification_service import publish_after_commit, queue_job_posted
+from services.upload_service import UploadError, save_document, delete_upload
+from werkzeug.exceptions import HTTPException
+from services.recommendation_service import (
+    recommend_jobs_page,
+    shortlist_candidates,
+    update_job_in_index,
+    remove_job_from_index,
+    invalidate_job_shortlist,
+)
+from services.autocomplete_service import (
+    add_suggestion,
+    remove_suggestion,
+    rename_suggestion,
+)
 from typing import Optional, List
 from decimal import Decimal
 from datetime import datetime
-import os
-from middlewares.auth import is_auth
+from middlewares.auth import is_auth, current_principal
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 
 
 @is_auth
 def get_jobs_for_user():
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         user_id = request.user_id
@@ -42,32 +56,72 @@ def get_jobs_for_user():
         page_size = 10
 
         # Fetch user
-        user = db.query(User).filter(User.id == user_id).first()
+        user = current_principal()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        user_skill_ids = [skill.id for skill in user.skills]
-
-        
-        print(user_skill_ids)
-        user_location = user.location or ""
-
-        jobs_query = db.query(Job)
-
-        # if user_location:
-        #     jobs_query = jobs_query.filter(Job.location.ilike(f"%{user_location}%"))
-
-        if user_skill_ids:
-            jobs_query = jobs_query.join(Job.skills).filter(Job.skills.any(Skill.id.in_(user_skill_ids)))
-
-        
-
-        jobs_query = jobs_query.order_by(desc(Job.created_at))
+        # Skill-matched feed, best match first. Offset pages with ?page=,
+        # keyset pages with ?cursor= holding the last job's (score, id)
+        cursor = request.args.get("cursor")
+        after = None
+        if cursor:
+            values = decode_cursor(cursor)
+            if (
+                len(values) == 2
+                and type(values[0]) in (int, float)
+                and type(values[1]) is int
+            ):
+                after = tuple(values)
+
+        page = max(page, 1)
+        page_ids, total, has_more = recommend_jobs_page(
+            db,
+            user_id,
+            user.location,
+            offset=(page - 1) * page_size,
+            after=after,
+            limit=page_size,
+        )
 
-        total_jobs = jobs_query.count()
-        total_pages = (total_jobs + page_size - 1) // page_size
-        
-        jobs = jobs_query.offset((page - 1) * page_size).limit(page_size).all()
+        if total:
+            if cursor and after is None:
+                raise ValueError("Invalid cursor")
+
+            scores = dict(page_ids)
+            jobs_by_id = {
+                job.id: job
+                for job in db.query(Job)
+                .options(*job_load_options())
+                .filter(Job.id.in_(scores))
+            }
+            jobs = [
+                jobs_by_id[job_id] for job_id, _ in page_ids if job_id in jobs_by_id
+            ]
+            if cursor is None:
+                meta = {
+                    "total": total,
+                    "page": page,
+                    "limit": page_size,
+                    "total_pages": (total + page_size - 1) // page_size,
+                }
+            else:
+                last_id, last_score = page_ids[-1] if page_ids else (None, None)
+                meta = {
+                    "total": total,
+                    "limit": page_size,
+                    "next_cursor": (
+                        encode_cursor([last_score, last_id]) if has_more else None
+                    ),
+                }
+        else:
+            # No skills or no matching job yet: fall back to the latest jobs
+            scores = {}
+            jobs, meta = paginate(
+                db.query(Job).options(*job_load_options()),
+                [Job.created_at, Job.id],
+                limit=page_size,
+                page=page,
+            )
 
         results = []
         for job in jobs:
@@ -89,26 +143,86 @@ def get_jobs_for_user():
                     "image": job.employer.image,
                     "headline": getattr(job.employer, "headLine", ""),
                 },
-                "applicants": len(job.applicants),
+                "applicants": job.applicants_count,
+                "match_score": scores.get(job.id),
             })
 
         
-        return jsonify({
-            "jobs": results,
-            "total": total_jobs,
-            "total_pages": total_pages,
-            "page": page
-        })
+        return jsonify({"jobs": results, **meta})
 
+    except ValueError as e:
+        # malformed page/limit/cursor parameters
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@is_auth
+def get_job_candidates(job_id: int):
+    """Ranked shortlist of candidates matching a job's skills (job owner only)"""
+    db: Session = get_db()
+
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+
+        if job.employer_id != request.user_id:
+            return (
+                jsonify({"error": "You can only view candidates for your own jobs"}),
+                403,
+            )
+
+        page = max(int(request.args.get("page", 1)), 1)
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+
+        ranked = shortlist_candidates(db, job)
+        page_ids = ranked[(page - 1) * limit : page * limit]
+        scores = dict(page_ids)
+
+        users_by_id = {
+            user.id: user
+            for user in db.query(User)
+            .options(selectinload(User.skills))
+            .filter(User.id.in_(scores))
+        }
+        job_skill_ids = {skill.id for skill in job.skills}
+
+        candidates = []
+        for user_id, score in page_ids:
+            user = users_by_id.get(user_id)
+            if not user:
+                continue
+            candidates.append({
+                "id": user.id,
+                "full_name": user.full_name,
+                "headLine": user.headLine,
+                "image": user.image,
+                "location": user.location,
+                "match_score": score,
+                "matched_skills": [
+                    skill.name for skill in user.skills if skill.id in job_skill_ids
+                ],
+            })
+
+        total = len(ranked)
+        return jsonify({
+            "candidates": candidates,
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "total_pages": (total + limit - 1) // limit,
+        }), 200
+
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def search_jobs():
     """Search and filter jobs"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         search = request.args.get("search", "").strip()
@@ -118,15 +232,17 @@ def search_jobs():
         page = int(request.args.get("page", 1))
         limit = int(request.args.get("limit", 10))
 
-        query = db.query(Job)
+        query = db.query(Job).options(*job_load_options())
+        rank = None
 
         if search:
-            search_filter = or_(
-                Job.title.ilike(f"%{search}%"),
-                Job.description.ilike(f"%{search}%"),
-                Job.company_name.ilike(f"%{search}%"),
-            )
-            query = query.filter(search_filter)
+            job_search = job_search_clause(search)
+            if job_search:
+                match, rank = job_search
+                query = query.filter(match)
+            else:
+                # only punctuation/whitespace: nothing can match
+                query = query.filter(false())
 
         if location:
             query = query.filter(Job.location.ilike(f"%{location}%"))
@@ -141,55 +257,47 @@ def search_jobs():
         if skill:
             query = query.filter(Job.skills.contains([skill]))
 
-        total = query.count()
+        order_by = [Job.created_at, Job.id]
+        if rank is not None:
+            order_by.insert(0, rank)
 
-        offset = (page - 1) * limit
-        jobs = query.order_by(Job.posted_at.desc()).offset(offset).limit(limit).all()
+        jobs, meta = paginate(query, order_by, limit=limit, page=page)
 
-        total_pages = (total + limit - 1) // limit
+        jobs_data = jobs_to_dicts(jobs)
 
-        jobs_data = [job_to_dict(job) for job in jobs]
-
-        return (
-            jsonify(
-                {
-                    "jobs": jobs_data,
-                    "total": total,
-                    "page": page,
-                    "limit": limit,
-                    "total_pages": total_pages,
-                }
-            ),
-            200,
-        )
+        return jsonify({"jobs": jobs_data, **meta}), 200
 
+    except ValueError as e:
+        # malformed page/limit/cursor parameters
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def get_job_by_id(job_id: int):
     """Get a single job by ID"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        job = db.query(Job).filter(Job.id == job_id).first()
+        job = (
+            db.query(Job)
+            .options(*job_load_options())
+            .filter(Job.id == job_id)
+            .first()
+        )
 
         if not job:
             return jsonify({"error": "Job not found"}), 404
 
-        return jsonify(job_to_dict(job)), 200
+        return jsonify(jobs_to_dicts([job])[0]), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def create_job():
     """Create a new job posting"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         # Authenticate user from JWT token
@@ -199,7 +307,7 @@ def create_job():
             return jsonify({"error": str(e)}), 401
 
         # Get user details
-        employer = db.query(User).filter(User.id == user_id).first()
+        employer = current_principal()
         if not employer:
             return jsonify({"error": "User not found"}), 404
 
@@ -286,29 +394,32 @@ def create_job():
             updated_at=datetime.utcnow(),
         )
 
-        # Set the relationship with employer
-        job.employer = employer
-
         # Set the many-to-many relationship with skills
         if job_skills:
             job.skills = job_skills
 
         db.add(job)
+        db.flush()
+        refresh_job_search_vectors(db, [job.id])
+        # Candidates with matching skills are notified in the background
+        queue_job_posted(db, job.id)
         db.commit()
         db.refresh(job)
 
+        add_suggestion("job_title", job.title)
+        add_suggestion("company", job.company)
+        update_job_in_index(job)
+
         return jsonify(job_to_dict(job)), 201
 
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def update_job(job_id: int):
     """Update an existing job"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         # Authenticate user from JWT token
@@ -327,6 +438,7 @@ def update_job(job_id: int):
             return jsonify({"error": "You can only update jobs you posted"}), 403
 
         data = request.get_json()
+        old_title, old_company = job.title, job.company
 
         if "title" in data:
             job.title = data["title"]
@@ -386,21 +498,26 @@ def update_job(job_id: int):
             job.skills = job_skills
 
         job.updated_at = datetime.utcnow()
+        db.flush()
+        refresh_job_search_vectors(db, [job.id])
         db.commit()
         db.refresh(job)
 
-        return jsonify(job_to_dict(job)), 200
+        rename_suggestion("job_title", old_title, job.title)
+        rename_suggestion("company", old_company, job.company)
+        update_job_in_index(job)
+        invalidate_job_shortlist(job_id)
+
+        return jsonify(jobs_to_dicts([job])[0]), 200
 
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def delete_job(job_id: int):
     """Delete a job"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         # Authenticate user from JWT token
@@ -418,21 +535,25 @@ def delete_job(job_id: int):
         if job.employer_id != user_id:
             return jsonify({"error": "You can only delete jobs you posted"}), 403
 
+        title, company = job.title, job.company
         db.delete(job)
         db.commit()
 
+        remove_suggestion("job_title", title)
+        remove_suggestion("company", company)
+        remove_job_from_index(job_id)
+        invalidate_job_shortlist(job_id)
+
         return jsonify({"message": "Job deleted successfully"}), 200
 
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def save_job(job_id: int):
     """Save a job for a user"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         try:
@@ -461,13 +582,11 @@ def save_job(job_id: int):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def unsave_job(job_id: int):
     """Unsave a job for a user"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         try:
@@ -492,13 +611,11 @@ def unsave_job(job_id: int):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def apply_to_job(job_id: int):
     """Apply to a job"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         try:
@@ -521,7 +638,7 @@ def apply_to_job(job_id: int):
         )
         if not job:
             return jsonify({"error": "Job not found"}), 404
-        user = db.query(User).filter(User.id == user_id).first()
+        user = current_principal()
         if not user:
             return jsonify({"error": "User not found"}), 404
         existing = (
@@ -538,56 +655,52 @@ def apply_to_job(job_id: int):
             file = request.files.get("cv_file") or request.files.get("cv")
 
             if file and file.filename:
-                allowed_extensions = {"pdf", "doc", "docx"}
-                file_ext = (
-                    file.filename.rsplit(".", 1)[1].lower()
-                    if "." in file.filename
-                    else ""
-                )
-
-                if file_ext not in allowed_extensions:
-                    return (
-                        jsonify(
-                            {"error": "Invalid file type. Only PDF, DOC, DOCX allowed."}
-                        ),
-                        400,
+                # Unique name: a concurrent duplicate application must not
+                # overwrite (or, failing, delete) the first one's CV
+                try:
+                    cv_file_path = save_document(
+                        file,
+                        "applications",
+                        f"cv_{user_id}_job_{job_id}_{uuid.uuid4().hex[:8]}",
                     )
+                except UploadError as e:
+                    return jsonify({"error": str(e)}), e.status
 
-                upload_dir = "uploads/applications"
-                os.makedirs(upload_dir, exist_ok=True)
-
-                filename = f"cv_{user_id}_job_{job_id}.{file_ext}"
-                filepath = os.path.join(upload_dir, filename)
-
-                file.save(filepath)
-                cv_file_path = f"/uploads/applications/{filename}"
-
-        application = Application(
-            job_id=job_id,
-            user_id=user_id,
-            cover_letter=cover_letter,
-            resume_url=cv_file_path,
-            status="pending",
-        )
-
-        db.add(application)
-
-        # Track applicants relationship
-        if user not in job.applicants:
-            job.applicants.append(user)
-
-        # Notify employer (avoid self-notify)
-        if job.employer_id and job.employer_id != user_id:
-            notification = Notification(
-                sender_id=user_id,
-                receiver_id=job.employer_id,
-                type="job_application",
-                title=f"New application for {job.title}",
-                message=f"{user.full_name} applied to your job \"{job.title}\"",
+        try:
+            application = Application(
+                job_id=job_id,
+                user_id=user_id,
+                cover_letter=cover_letter,
+                resume_url=cv_file_path,
+                status="pending",
             )
-            db.add(notification)
 
-        db.commit()
+            db.add(application)
+
+            # Track applicants relationship and the job's applicant counter;
+            # an existing link means a concurrent request applied first
+            if not link_applicant(db, job_id, user_id):
+                db.rollback()
+                delete_upload(cv_file_path)
+                return jsonify({"error": "You have already applied to this job"}), 400
+
+            # Notify employer (avoid self-notify)
+            if job.employer_id and job.employer_id != user_id:
+                notification = Notification(
+                    sender_id=user_id,
+                    receiver_id=job.employer_id,
+                    type="job_application",
+                    title=f"New application for {job.title}",
+                    message=f"{user.full_name} applied to your job \"{job.title}\"",
+                )
+                db.add(notification)
+                publish_after_commit(db, notification)
+
+            db.commit()
+        except Exception:
+            # The application was not saved, so neither is its CV
+            delete_upload(cv_file_path)
+            raise
         db.refresh(application)
 
         return (
@@ -600,16 +713,17 @@ def apply_to_job(job_id: int):
             201,
         )
 
+    except HTTPException:
+        # e.g. 413 from MAX_CONTENT_LENGTH, answered by its error handler
+        raise
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def report_job(job_id: int):
     """Report a job with a reason"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         try:
@@ -644,13 +758,11 @@ def report_job(job_id: int):
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def get_employer_jobs():
     """Get all jobs created by the authenticated employer"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         # Authenticate user from JWT token
@@ -660,7 +772,7 @@ def get_employer_jobs():
             return jsonify({"error": str(e)}), 401
 
         # Get user and verify is employer
-        user = db.query(User).filter(User.id == user_id).first()
+        user = current_principal()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -677,48 +789,53 @@ def get_employer_jobs():
         order = request.args.get("order", "desc")  # asc or desc
 
         # Build query for jobs by this employer
-        query = db.query(Job).filter(Job.employer_id == user_id)
+        query = (
+            db.query(Job)
+            .options(*job_load_options())
+            .filter(Job.employer_id == user_id)
+        )
 
-        # Apply sorting
+        # Apply sorting (id breaks ties so the cursor key is unique)
         if sort == "title":
             sort_column = Job.title
         else:
             sort_column = Job.created_at
 
-        if order.lower() == "asc":
-            query = query.order_by(sort_column.asc())
-        else:
-            query = query.order_by(sort_column.desc())
+        # Offset pages, or keyset pages when a ?cursor= is given
+        jobs, meta = paginate(
+            query,
+            [sort_column, Job.id],
+            descending=order.lower() != "asc",
+            limit=limit,
+            page=page,
+        )
 
-        # Get total count
-        total = query.count()
+        jobs_data = jobs_to_dicts(jobs)
 
-        # Apply pagination
-        offset = (page - 1) * limit
-        jobs = query.offset(offset).limit(limit).all()
+        return jsonify({"jobs": jobs_data, **meta}), 200
 
-        # Calculate total pages
-        total_pages = (total + limit - 1) // limit
+    except ValueError as e:
+        # malformed page/limit/cursor parameters
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        jobs_data = [job_to_dict(job) for job in jobs]
 
-        return (
-            jsonify(
-                {
-                    "jobs": jobs_data,
-                    "total": total,
-                    "page": page,
-                    "limit": limit,
-                    "total_pages": total_pages,
-                }
-            ),
-            200,
-        )
+def job_load_options():
+    """Loader options preloading everything job_to_dict reads"""
+    return (
+        joinedload(Job.employer),
+        joinedload(Job.category),
+        selectinload(Job.skills),
+    )
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
+
+def jobs_to_dicts(jobs) -> List[dict]:
+    """
+    Serialize a page of jobs. Load them with job_load_options() so the
+    relationships are already in memory and serializing issues no queries.
+    """
+    return [job_to_dict(job) for job in jobs]
 
 
 def job_to_dict(job: Job) -> dict:
@@ -742,6 +859,7 @@ def job_to_dict(job: Job) -> dict:
         if employer
         else None,
         "location": job.location,
+        "category_id": job.category_id,
         "category": category.name if category else None,
         "salary_range": job.salary_range,
         "emp_type": job.emp_type,
@@ -751,13 +869,13 @@ def job_to_dict(job: Job) -> dict:
         ],
         "created_at": job.created_at.isoformat() if job.created_at else None,
         "updated_at": job.updated_at.isoformat() if job.updated_at else None,
-        "applicants_count": len(job.applicants) if job.applicants else 0,
+        "applicants_count": job.applicants_count or 0,
     }
 
 
 def get_skills():
     """Get all available skills (public endpoint)"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         skills = db.query(Skill).order_by(Skill.name).all()
@@ -766,8 +884,6 @@ def get_skills():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
 def create_skill_if_not_exists(skill_name: str, db: Session) -> Skill:
@@ -786,12 +902,14 @@ def create_skill_if_not_exists(skill_name: str, db: Session) -> Skill:
     db.commit()
     db.refresh(new_skill)
 
+    add_suggestion("skill", new_skill.name)
+
     return new_skill
 
 
 def create_or_get_skill():
     """Create a new skill or get existing one (public endpoint)"""
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
         data = request.get_json()
@@ -816,5 +934,3 @@ def create_or_get_skill():
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
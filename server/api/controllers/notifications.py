@@ -1,93 +1,126 @@
-from flask import request, jsonify
-from sqlalchemy.orm import Session
-from config.db import SessionLocal
-from core.models import Notification, User
-import jwt
+import json
 import os
 
+from flask import Response, request, jsonify
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, joinedload
+from config.db import get_db
+from core.models import Notification
+from controllers.utils import get_user_id_from_token, paginate
+from middlewares.auth import SCOPED_TOKEN_TTL, encode_scoped_token
+from services.notification_service import get_broker, notification_to_dict
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# The badge shows "99+" past this, so counting stops there
+UNREAD_COUNT_CAP = 100
+
+# Comment line sent on idle streams so proxies keep them open
+STREAM_KEEPALIVE_SECONDS = int(os.getenv("NOTIFICATION_KEEPALIVE_SECONDS", 25))
+
+# Notifications replayed to a reconnecting stream (Last-Event-ID)
+STREAM_REPLAY_LIMIT = 50
+
+# Scope of the short-lived ?token= accepted by the stream
+STREAM_TOKEN_SCOPE = "notifications:stream"
+
+# Each open stream holds a server thread for as long as it is connected,
+# so a user (e.g. with many tabs) gets at most this many per process
+STREAM_MAX_PER_USER = int(os.getenv("NOTIFICATION_STREAMS_PER_USER", 3))
 
 
 def get_notifications():
-    """Get notifications for the current user"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
+    """
+    Get notifications for the current user, newest first.
 
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
+    Without ?cursor= it returns the latest `limit` (default 20) as a list.
+    With ?cursor= (empty for the first page) it returns
+    {notifications, limit, next_cursor}, keyset-paginated on (created_at, id).
+    """
+    try:
+        current_user_id = get_user_id_from_token()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 401
 
-    db: Session = next(get_db())
+    db: Session = get_db()
 
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
+        limit = min(int(request.args.get("limit", 20)), 100)
+        if limit < 1:
+            return jsonify({"error": "limit must be positive"}), 400
 
-        notifications = (
+        query = (
             db.query(Notification)
+            .options(joinedload(Notification.sender))
             .filter(Notification.receiver_id == current_user_id)
-            .order_by(Notification.created_at.desc())
-            .limit(20)
-            .all()
         )
+        order_by = [Notification.created_at, Notification.id]
+
+        if request.args.get("cursor") is None:
+            notifications = (
+                query.order_by(*[column.desc() for column in order_by])
+                .limit(limit)
+                .all()
+            )
+            return jsonify([notification_to_dict(n) for n in notifications]), 200
 
+        notifications, meta = paginate(query, order_by, limit=limit)
         return (
             jsonify(
-                [
-                    {
-                        "id": notif.id,
-                        "sender_id": notif.sender_id,
-                        "receiver_id": notif.receiver_id,
-                        "type": notif.type,
-                        "title": notif.title,
-                        "message": notif.message,
-                        "is_read": notif.is_read,
-                        "created_at": notif.created_at.isoformat(),
-                        "sender": (
-                            {
-                                "id": notif.sender.id,
-                                "full_name": notif.sender.full_name,
-                                "image": notif.sender.image,
-                            }
-                            if notif.sender
-                            else None
-                        ),
-                    }
-                    for notif in notifications
-                ]
+                {
+                    "notifications": [notification_to_dict(n) for n in notifications],
+                    **meta,
+                }
             ),
             200,
         )
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
 
 
-def mark_notification_read(notification_id: int):
-    """Mark a notification as read"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return jsonify({"error": "Missing or invalid Authorization header"}), 401
+def get_unread_count():
+    """Number of unread notifications, capped at UNREAD_COUNT_CAP"""
+    try:
+        current_user_id = get_user_id_from_token()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 401
 
-    token = auth_header.split(" ")[1]
-    JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
+    db: Session = get_db()
 
-    db: Session = next(get_db())
+    try:
+        # Bounded count over ix_notifications_receiver_is_read_created: the
+        # cost does not grow with the user's notification history
+        unread = (
+            select(Notification.id)
+            .where(
+                Notification.receiver_id == current_user_id,
+                Notification.is_read == 0,
+            )
+            .limit(UNREAD_COUNT_CAP)
+            .subquery()
+        )
+        count = db.scalar(select(func.count()).select_from(unread))
 
+        return (
+            jsonify({"unread_count": count, "capped": count >= UNREAD_COUNT_CAP}),
+            200,
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def mark_notification_read(notification_id: int):
+    """Mark a notification as read"""
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        current_user_id = decoded["id"]
+        current_user_id = get_user_id_from_token()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 401
+
+    db: Session = get_db()
 
+    try:
         notification = (
             db.query(Notification)
             .filter(
@@ -105,10 +138,129 @@ def mark_notification_read(notification_id: int):
 
         return jsonify({"message": "Notification marked as read"}), 200
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
+
+
+def mark_all_notifications_read():
+    """Mark every unread notification of the current user as read"""
+    try:
+        current_user_id = get_user_id_from_token()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 401
+
+    db: Session = get_db()
+
+    try:
+        result = db.execute(
+            update(Notification)
+            .where(
+                Notification.receiver_id == current_user_id,
+                Notification.is_read == 0,
+            )
+            .values(is_read=1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        return (
+            jsonify(
+                {
+                    "message": "Notifications marked as read",
+                    "updated": result.rowcount,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+def _sse(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+
+
+def create_stream_token():
+    """
+    Short-lived token for opening the notification stream. EventSource
+    cannot set headers, so it goes in the URL (?token=), where the login
+    token must never appear: access logs and browser history keep URLs.
+    """
+    try:
+        current_user_id = get_user_id_from_token()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 401
+
+    token = encode_scoped_token(current_user_id, STREAM_TOKEN_SCOPE)
+    return jsonify({"token": token, "expires_in": SCOPED_TOKEN_TTL}), 201
+
+
+def stream_notifications():
+    """
+    Server-Sent Events stream of the current user's new notifications.
+    Authenticated by the Authorization header or by a stream token from
+    create_stream_token as ?token= (only needed to open the stream; on a
+    401 the client fetches a new one). On reconnect, notifications after
+    Last-Event-ID are replayed.
+    """
+    try:
+        current_user_id = get_user_id_from_token(scope=STREAM_TOKEN_SCOPE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 401
+
+    # Subscribe before reading the backlog so nothing falls in between
+    broker = get_broker()
+    subscription = broker.subscribe(current_user_id, limit=STREAM_MAX_PER_USER)
+    if subscription is None:
+        return jsonify({"error": "Too many open notification streams"}), 429
+
+    missed = []
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    if last_event_id.isdigit():
+        db: Session = get_db()
+        try:
+            missed = (
+                db.query(Notification)
+                .options(joinedload(Notification.sender))
+                .filter(
+                    Notification.receiver_id == current_user_id,
+                    Notification.id > int(last_event_id),
+                )
+                .order_by(Notification.id)
+                .limit(STREAM_REPLAY_LIMIT)
+                .all()
+            )
+            missed = [notification_to_dict(n) for n in missed]
+        except Exception as e:
+            broker.unsubscribe(subscription)
+            return jsonify({"error": str(e)}), 500
+        finally:
+            # The request lasts as long as the stream; hand the
+            # connection back to the pool now
+            db.rollback()
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            sent = set()
+            for payload in missed:
+                sent.add(payload["id"])
+                yield _sse(payload)
+
+            while True:
+                payload = subscription.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                if payload is None:
+                    yield ": keep-alive\n\n"
+                elif payload["id"] not in sent:
+                    yield _sse(payload)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,9 +1,10 @@
 from flask import request, jsonify
 from sqlalchemy.orm import Session
-from core.models import User, PasswordResetToken, engine
+from config.db import get_db
+from core.models import User, PasswordResetToken
 from datetime import datetime, timedelta
 import secrets
-from werkzeug.security import generate_password_hash
+from services.password_service import hash_password
 from services.email import send_reset_email
 import os
 
@@ -13,7 +14,7 @@ def request_password_reset():
     Request a password reset link.
     Sends an email with a reset token to the user.
     """
-    session = Session(engine)
+    session = get_db()
     try:
         data = request.get_json()
         email = data.get("email")
@@ -52,13 +53,13 @@ def request_password_reset():
             expires_at=expires_at
         )
         session.add(reset_token)
-        session.commit()
 
-        # Send email with reset link
+        # Queue email with reset link, sent in the background after commit
         # reset_url = f"{request.host_url}reset-password?token={token}"
         frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
         reset_url = f"{frontend_url}/reset-password?token={token}"
-        send_reset_email(user.email, user.full_name, reset_url)
+        send_reset_email(session, user.email, user.full_name, reset_url)
+        session.commit()
 
         return jsonify({
             "message": "If an account exists with this email, a reset link has been sent."
@@ -71,8 +72,6 @@ def request_password_reset():
         traceback.print_exc()
         return jsonify({"error": "An error occurred"}), 500
     
-    finally:
-        session.close()
 
 
 def verify_reset_token():
@@ -80,7 +79,7 @@ def verify_reset_token():
     Verify if a reset token is valid.
     Used to check token before showing reset form.
     """
-    session = Session(engine)
+    session = get_db()
     try:
         token = request.args.get("token")
 
@@ -107,15 +106,13 @@ def verify_reset_token():
         traceback.print_exc()
         return jsonify({"error": "An error occurred"}), 500
     
-    finally:
-        session.close()
 
 
 def reset_password():
     """
     Reset password using the token.
     """
-    session = Session(engine)
+    session = get_db()
     try:
         data = request.get_json()
         token = data.get("token")
@@ -143,8 +140,8 @@ def reset_password():
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        # Hash new password (using werkzeug - same as Flask's default)
-        hashed_password = generate_password_hash(new_password)
+        # Hash new password (method and cost from services.password_service)
+        hashed_password = hash_password(new_password)
 
         # Update password
         user.password = hashed_password
@@ -164,6 +161,3 @@ def reset_password():
         import traceback
         traceback.print_exc()
         return jsonify({"error": "An error occurred"}), 500
-    
-    finally:
-        session.close()
\ No newline at end of file
@@ -1,14 +1,14 @@
 from flask import request, jsonify
-from config.db import SessionLocal
-from core.models import User, Job, Skill, Category
+from config.db import get_db
 from controllers.utils import get_user_id_from_token
-from sqlalchemy import or_, func
+from services.search_service import cached_unified_search
+from services.autocomplete_service import suggest, SUGGESTION_LIMIT
 
 
 def search_all():
     q = request.args.get("query") or request.args.get("q") or request.args.get("search") or ""
     q = q.strip()
-    db = SessionLocal()
+    db = get_db()
     try:
         # try get current user id if provided, otherwise None
         current_user_id = None
@@ -17,122 +17,26 @@ def search_all():
         except Exception:
             current_user_id = None
 
-        result = {"employers": [], "candidates": [], "jobs": []}
+        # Employers, candidates (by name, headline or skill) and jobs in one
+        # round trip; per-type limits and the caller exclusion run in SQL.
+        # Responses are cached briefly per normalized query.
+        result = cached_unified_search(db, q, exclude_user_id=current_user_id)
 
-        if not q:
-            return jsonify(result), 200
-
-        like_q = f"%{q}%"
-
-        # Employers: search by companyName, full_name, email
-        employers = (
-            db.query(User)
-            .filter(User.role == "employer")
-            .filter(
-                or_(
-                    User.companyName.ilike(like_q),
-                    User.full_name.ilike(like_q),
-                    User.email.ilike(like_q),
-                )
-            )
-            .limit(6)
-            .all()
-        )
-
-        for e in employers:
-            if current_user_id and e.id == current_user_id:
-                continue
-            result["employers"].append(
-                {
-                    "id": e.id,
-                    "role": e.role,
-                    "full_name": e.full_name,
-                    "headLine": getattr(e, "headLine", ""),
-                    "image": e.image,
-                }
-            )
-
-        # Candidates: search by full_name, headLine, skills
-        candidates_q = (
-            db.query(User)
-            .filter(User.role == "candidate")
-            .filter(
-                or_(
-                    User.full_name.ilike(like_q),
-                    getattr(User, "headLine").ilike(like_q),
-                )
-            )
-            .limit(6)
-            .all()
-        )
-
-        for c in candidates_q:
-            if current_user_id and c.id == current_user_id:
-                continue
-            result["candidates"].append(
-                {
-                    "id": c.id,
-                    "role": c.role,
-                    "full_name": c.full_name,
-                    "headLine": getattr(c, "headLine", ""),
-                    "image": c.image,
-                }
-            )
-
-        # Also search candidates by skill name
-        skill_matches = (
-            db.query(User)
-            .join(User.skills)
-            .filter(User.role == "candidate")
-            .filter(Skill.name.ilike(like_q))
-            .limit(6)
-            .all()
-        )
-
-        for c in skill_matches:
-            if any(cm["id"] == c.id for cm in result["candidates"]):
-                continue
-            if current_user_id and c.id == current_user_id:
-                continue
-            result["candidates"].append(
-                {
-                    "id": c.id,
-                    "role": c.role,
-                    "full_name": c.full_name,
-                    "headLine": getattr(c, "headLine", ""),
-                    "image": c.image,
-                }
-            )
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Jobs: search by title, company, description, category
-        jobs = (
-            db.query(Job)
-            .outerjoin(Category, Job.category)
-            .filter(
-                or_(
-                    Job.title.ilike(like_q),
-                    Job.description.ilike(like_q),
-                    Job.company.ilike(like_q),
-                    Category.name.ilike(like_q),
-                )
-            )
-            .limit(12)
-            .all()
-        )
 
-        for j in jobs:
-            desc = (j.description or "")
-            short = desc[:100] + ("..." if len(desc) > 100 else "")
-            result["jobs"].append(
-                {
-                    "id": j.id,
-                    "title": j.title,
-                    "description": short,
-                }
-            )
+def suggest_terms():
+    """Search-as-you-type suggestions: job titles, companies, skills, categories"""
+    q = request.args.get("query") or request.args.get("q") or ""
+    try:
+        limit = min(int(request.args.get("limit", SUGGESTION_LIMIT)), 20)
+    except ValueError:
+        limit = SUGGESTION_LIMIT
 
-        return jsonify(result), 200
+    db = get_db()
+    try:
+        return jsonify({"suggestions": suggest(db, q, limit)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        db.close()
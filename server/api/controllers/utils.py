@@ -1,42 +1,158 @@
 """Utility functions for controllers"""
 
 from flask import request
-import jwt
-from config.db import SessionLocal
+from sqlalchemy import tuple_
+from datetime import datetime
+from decimal import Decimal
+import base64
+import json
+from config.db import get_db
 from core.models import User
-import os
-from dotenv import load_dotenv
+from middlewares.auth import current_user_id
 
-load_dotenv()
-JWT_SECRET = os.getenv("JWT_SECRET", "secret123")
 
+def get_user_id_from_token(scope: str = None) -> int:
+    """
+    User ID of the request's verified JWT (see middlewares.auth). With a
+    scope, a short-lived token for it is accepted as ?token= too
+    (EventSource cannot send headers).
+    """
+    return current_user_id(scope)
 
-def get_user_id_from_token() -> int:
-    """Extract user ID from JWT token in Authorization header"""
-    auth_header = request.headers.get("Authorization")
 
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise ValueError("Missing or invalid Authorization header")
+def get_current_user_from_token() -> User:
+    """Get current user from JWT token"""
+    user_id = get_user_id_from_token()
+    db = get_db()
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise ValueError("User not found")
+    return user
 
-    token = auth_header.split(" ")[1]
 
+# ============================================================
+# KEYSET (CURSOR) PAGINATION
+# ============================================================
+def encode_cursor(values) -> str:
+    """Encode the sort key of the last row of a page as an opaque token"""
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> list:
+    """Inverse of encode_cursor, raises ValueError for tampered tokens"""
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        return decoded["id"]
-    except jwt.ExpiredSignatureError:
-        raise ValueError("Token expired")
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        return [
+            datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v
+            for v in payload
+        ]
     except Exception:
-        raise ValueError("Invalid token")
+        raise ValueError("Invalid cursor")
 
 
-def get_current_user_from_token() -> User:
-    """Get current user from JWT token"""
-    user_id = get_user_id_from_token()
-    db = SessionLocal()
+def _cursor_value_matches(column, value) -> bool:
+    """True when a decoded cursor value can be compared with `column`"""
+    if value is None:
+        return True
+    if isinstance(value, bool):
+        return False
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise ValueError("User not found")
-        return user
-    finally:
-        db.close()
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return isinstance(value, (int, float, str))
+
+    if python_type is int:
+        return isinstance(value, int)
+    if python_type in (float, Decimal):
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+
+def keyset_paginate(query, order_by, cursor=None, limit=10, descending=True):
+    """
+    Return (items, next_cursor) for the page after `cursor`.
+    `order_by` is the unique sort key, e.g. [Job.created_at, Job.id]; the
+    query must not be ordered yet. Seeks with a row comparison
+    ((created_at, id) < (:c, :i)) so deep pages cost the same as the first.
+    """
+    keys = [column.label(f"_cursor_{i}") for i, column in enumerate(order_by)]
+    query = query.add_columns(*keys)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(order_by) or not all(
+            _cursor_value_matches(column, value)
+            for column, value in zip(order_by, values)
+        ):
+            raise ValueError("Invalid cursor")
+        if descending:
+            query = query.filter(tuple_(*order_by) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*order_by) > tuple_(*values))
+
+    query = query.order_by(
+        *[column.desc() if descending else column.asc() for column in order_by]
+    )
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][1:]))
+
+    return [row[0] for row in rows], next_cursor
+
+
+def estimate_count(query) -> int:
+    """Row estimate from the planner statistics (EXPLAIN), no table scan"""
+    session = query.session
+    compiled = query.statement.compile(
+        dialect=session.bind.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    plan = (
+        session.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params)
+        .scalar()
+    )
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def paginate(query, order_by, descending=True, limit=10, page=1):
+    """
+    Paginate a query from the request arguments.
+
+    With ?cursor= (empty for the first page) it uses keyset pagination and
+    returns next_cursor; the total is only computed on demand with
+    ?include_total=exact or the planner estimate with ?include_total=estimate.
+    Without a cursor it keeps the classic page/total_pages response.
+    Returns (items, meta).
+    """
+    cursor = request.args.get("cursor")
+
+    if cursor is None:
+        total = query.count()
+        ordering = [c.desc() if descending else c.asc() for c in order_by]
+        items = query.order_by(*ordering).offset((page - 1) * limit).limit(limit).all()
+        return items, {
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "total_pages": (total + limit - 1) // limit,
+        }
+
+    items, next_cursor = keyset_paginate(
+        query, order_by, cursor=cursor, limit=limit, descending=descending
+    )
+    meta = {"limit": limit, "next_cursor": next_cursor}
+
+    include_total = request.args.get("include_total")
+    if include_total == "exact":
+        meta["total"] = query.count()
+    elif include_total == "estimate":
+        meta["total"] = estimate_count(query)
+        meta["total_is_estimate"] = True
+
+    return items, meta
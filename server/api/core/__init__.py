@@ -1,30 +1,72 @@
 import os
 
+import click
 from dotenv import load_dotenv
 from flask import Flask
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
+from config.db import engine_options
+from core.models import Base
+
 load_dotenv()
 
 
-database = SQLAlchemy()
+# Bound to the models' metadata so `flask db migrate` can autogenerate
+database = SQLAlchemy(metadata=Base.metadata)
 db_migration = Migrate()
 
 
-def create_app(config_type=os.getenv("CONFIG_TYPE")):
+def create_app(
+    config_type=os.getenv("CONFIG_TYPE", "config.settings.DevelopmentConfig")
+):
     app = Flask(__name__)
 
     app.config.from_object(config_type)
 
     initailize_extension(app)
+    register_commands(app)
 
     return app
 
 
+def create_tables(bind=None):
+    """
+    Create missing tables, indexes and extensions. Importing core.models
+    never touches the database; run this instead. Existing tables are not
+    altered: upgrade those with the scripts in server/scripts.
+    """
+    if bind is None:
+        from config.db import engine as bind
+
+    Base.metadata.create_all(bind)
+
+
+@click.command("init-db")
+def init_db_command():
+    """Create the database tables that do not exist yet"""
+    create_tables()
+    click.echo("Tables created successfully!")
+
+
+@click.command("run-workers")
+def run_workers_command():
+    """Run the stat rollup and outbound email workers in this process"""
+    from services.worker_service import run_background_workers
+
+    click.echo("Waiting for the background workers lock...")
+    run_background_workers()
+
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(run_workers_command)
+
+
 def initailize_extension(app):
+    # Same pool and timeout settings as config.db.engine
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options())
+
     database.init_app(app)
 
     db_migration.init_app(app, database)
-
-    import core.models  # noqa:F401
@@ -1,5 +1,4 @@
 from sqlalchemy import (
-    create_engine,
     Column,
     Integer,
     String,
@@ -11,26 +10,24 @@ from sqlalchemy import (
     Table,
     ARRAY,
     MetaData,
+    Index,
+    DDL,
+    event,
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-DB_USER = os.getenv("DB_USERNAME")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-engine = create_engine(DATABASE_URL, echo=True)
 Base = declarative_base(metadata=MetaData(schema="public"))
 
+# Trigram indexes (gin_trgm_ops) need the pg_trgm extension before the tables
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+)
+
 # ============================================================
 # MANY-TO-MANY: USER ↔ SKILLS
 # ============================================================
@@ -46,6 +43,8 @@ user_skills = Table(
         ForeignKey("skills.id", ondelete="CASCADE"),
         primary_key=True,
     ),
+    # skill -> users lookups (job_posted fan-out)
+    Index("ix_user_skills_skill_user", "skill_id", "user_id"),
 )
 
 # ============================================================
@@ -105,6 +104,20 @@ class User(Base):
 
     created_at = Column(DateTime, server_default=func.now())
 
+    # Trigram indexes serving fuzzy people search (similarity and ILIKE)
+    __table_args__ = tuple(
+        Index(
+            f"ix_users_{column.lower()}_trgm",
+            column,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+        for column in ("full_name", "companyName", "headLine")
+    ) + (
+        # Incremental stat rollups scan recent signups
+        Index("ix_users_created_at", "created_at"),
+    )
+
     # Relationships
     educations = relationship("Education", backref="user", cascade="all, delete-orphan")
     experiences = relationship(
@@ -191,6 +204,21 @@ class Job(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now(), server_default=func.now())
 
+    # Weighted full-text document (title, company, skills, category, description),
+    # maintained by services.search_service.refresh_job_search_vectors
+    search_vector = Column(TSVECTOR)
+
+    # Denormalized size of job_applicants for this job, kept in step by
+    # services.applications_service (link_applicant / unlink_applicant)
+    applicants_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_jobs_search_vector", "search_vector", postgresql_using="gin"),
+        # Keyset pagination: (created_at, id) seeks for feeds and listings
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_employer_id_created_at_id", "employer_id", "created_at", "id"),
+    )
+
     employer = relationship("User", backref="jobs_posted")
     category = relationship("Category")
     applicants = relationship("User", secondary=job_applicants, backref="applied_jobs")
@@ -215,6 +243,9 @@ class Application(Base):
     )
     applied_at = Column(DateTime, server_default=func.now())
 
+    # Incremental stat rollups scan recent applications
+    __table_args__ = (Index("ix_applications_applied_at", "applied_at"),)
+
 
 # ============================================================
 # SAVED JOB MODEL
@@ -273,6 +304,37 @@ class Notification(Base):
         backref="received_notifications",
     )
 
+    __table_args__ = (
+        # Feed: a user's notifications newest first, keyset on (created_at, id)
+        Index(
+            "ix_notifications_receiver_created_id", "receiver_id", "created_at", "id"
+        ),
+        # Unread badge: index-only count of a user's unread rows
+        Index(
+            "ix_notifications_receiver_is_read_created",
+            "receiver_id",
+            "is_read",
+            "created_at",
+        ),
+    )
+
+
+class NotificationFanout(Base):
+    """
+    A posted job whose job_posted notifications are still being sent, in
+    chunks, by the background fan-out in services.notification_service.
+    Inserted in the same transaction as the job, so it survives a crash.
+    """
+
+    __tablename__ = "notification_fanouts"
+
+    job_id = Column(
+        Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Candidates up to this id have been notified
+    after_user_id = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime, server_default=func.now())
+
 
 # ============================================================
 # REPORT MODEL
@@ -312,6 +374,12 @@ class ConnectionRequest(Base):
 
     created_at = Column(DateTime, server_default=func.now())
 
+    # Both directions of the "already connected" anti-join
+    __table_args__ = (
+        Index("ix_connection_requests_sender_receiver", "sender_id", "receiver_id"),
+        Index("ix_connection_requests_receiver_sender", "receiver_id", "sender_id"),
+    )
+
     # Relationships
     sender = relationship("User", foreign_keys=[sender_id], backref="sent_requests")
     receiver = relationship(
@@ -332,6 +400,9 @@ class DeleteRequest(Base):
     reason = Column(Text, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
+    # Incremental stat rollups scan recent requests
+    __table_args__ = (Index("ix_delete_requests_created_at", "created_at"),)
+
     # Relationship to user
     user = relationship("User", backref="delete_requests")
 
@@ -357,8 +428,61 @@ class PasswordResetToken(Base):
     user = relationship("User", backref="reset_tokens")
 
 
-Base.metadata.create_all(engine)
-print("Tables created successfully!")
+# ============================================================
+# STAT ROLLUPS (admin charts)
+# ============================================================
+class StatRollup(Base):
+    """
+    Daily row counts per metric and dimension, e.g. ("users", "candidate")
+    or ("applications", "pending"). Maintained by services.rollup_service.
+    """
+
+    __tablename__ = "stat_rollups"
+
+    bucket_date = Column(Date, primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    dimension = Column(String(100), primary_key=True, server_default="")
+    count = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (Index("ix_stat_rollups_metric_date", "metric", "bucket_date"),)
+
 
+class RollupWatermark(Base):
+    """When each rollup metric was last refreshed"""
 
+    __tablename__ = "rollup_watermarks"
 
+    metric = Column(String(50), primary_key=True)
+    refreshed_at = Column(DateTime, nullable=False)
+
+
+# ============================================================
+# OUTBOUND EMAIL QUEUE
+# ============================================================
+class OutboundEmail(Base):
+    """
+    An email waiting to be sent, or already sent, by the background sender
+    in services.email. Requests only insert rows here.
+    """
+
+    __tablename__ = "outbound_emails"
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_body = Column(Text, nullable=False)
+    text_body = Column(Text)
+    status = Column(
+        Enum("pending", "sent", "failed", name="outbound_email_status"),
+        nullable=False,
+        server_default="pending",
+    )
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text)
+    send_after = Column(DateTime, nullable=False, server_default=func.now())
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_outbound_emails_status_send_after", "status", "send_after"),
+    )
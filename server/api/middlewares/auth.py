@@ -1,35 +1,146 @@
-from functools import wraps
-from flask import request, jsonify
-import jwt
+import hashlib
 import os
+import threading
+import time
+from functools import wraps
 
-SECRET_KEY = os.getenv("JWT_SECRET")
+import jwt
+from cachetools import TLRUCache
+from dotenv import load_dotenv
+from flask import g, request, jsonify
+from config.db import get_db
+from services.principal_service import load_principal
+
+load_dotenv()
+
+# The one secret used to sign (controllers.auth) and verify tokens. No
+# default: a guessable one would let anyone forge admin tokens
+JWT_SECRET = os.getenv("JWT_SECRET")
+if not JWT_SECRET:
+    raise RuntimeError("JWT_SECRET must be set to a long random value")
+JWT_ALGORITHM = "HS256"
+
+# Short-lived tokens limited to one use (their "scope" claim), for clients
+# that can only pass a token in the URL, e.g. EventSource
+SCOPED_TOKEN_TTL = int(os.getenv("SCOPED_TOKEN_TTL", 60))
+
+# Verified claims are kept until the token's exp, at most this long
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+
+
+def _claims_expire_at(_key, claims, now):
+    expires_at = now + TOKEN_CACHE_TTL
+    if "exp" in claims:
+        expires_at = min(expires_at, claims["exp"])
+    return expires_at
+
+
+# sha256(token) -> claims; keyed by digest so tokens are not held in memory
+_claims_cache = TLRUCache(
+    maxsize=TOKEN_CACHE_SIZE, ttu=_claims_expire_at, timer=time.time
+)
+_claims_lock = threading.Lock()
+
+
+def encode_token(claims: dict) -> str:
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def encode_scoped_token(user_id: int, scope: str) -> str:
+    """A token that only opens `scope` and expires after SCOPED_TOKEN_TTL"""
+    return encode_token(
+        {"id": user_id, "scope": scope, "exp": int(time.time()) + SCOPED_TOKEN_TTL}
+    )
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verified claims of a token, from the cache when it was seen before.
+    Raises ValueError("Token expired") or ValueError("Invalid token").
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    with _claims_lock:
+        claims = _claims_cache.get(key)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise ValueError("Token expired")
+    except jwt.InvalidTokenError:
+        raise ValueError("Invalid token")
+
+    if claims.get("id") is None:
+        raise ValueError("Invalid token: user_id missing")
+
+    with _claims_lock:
+        _claims_cache[key] = claims
+    return claims
+
+
+def get_bearer_token():
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        return auth_header.split(" ")[1]
+    return None
+
+
+def authenticate(scope: str = None) -> dict:
+    """
+    Verify the request's token once and attach the claims to it
+    (g.claims, g.user_id and request.user_id). Later calls in the same
+    request reuse them. With a scope, a scoped token for it is also
+    accepted as ?token=. Raises ValueError when unauthenticated.
+    """
+    if "claims" in g:
+        return g.claims
+
+    token = get_bearer_token()
+    if token:
+        claims = decode_token(token)
+        # Scoped tokens travel in URLs; they never stand in for a login
+        if "scope" in claims:
+            raise ValueError("Invalid token")
+    elif scope and request.args.get("token"):
+        claims = decode_token(request.args["token"])
+        if claims.get("scope") != scope:
+            raise ValueError("Invalid token")
+    else:
+        raise ValueError("Missing or invalid Authorization header")
+
+    g.claims = claims
+    g.user_id = request.user_id = claims["id"]
+    return claims
+
+
+def current_user_id(scope: str = None) -> int:
+    """Id of the authenticated caller, raises ValueError otherwise"""
+    return authenticate(scope)["id"]
+
+
+def current_principal():
+    """
+    Snapshot (services.principal_service.Principal) of the authenticated
+    caller, loaded once per request and cached across requests. None if
+    the user no longer exists. Raises ValueError when unauthenticated.
+    """
+    if "principal" not in g:
+        g.principal = load_principal(get_db(), current_user_id())
+    return g.principal
 
 
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-
-        if "Authorization" in request.headers:
-            auth_header = request.headers["Authorization"]
-            if auth_header.startswith("Bearer "):
-                token = auth_header.split(" ")[1]
-
-        if not token:
-            return jsonify({"error": "Token missing"}), 401
-
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-
-            if payload.get("role") != "admin":
-                print(payload.get("role"))
-                return jsonify({"error": "Admin access only"}), 403
+            payload = authenticate()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 401
 
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+        if payload.get("role") != "admin":
+            return jsonify({"error": "Admin access only"}), 403
 
         return f(*args, **kwargs)
 
@@ -39,26 +150,10 @@ def admin_required(f):
 def is_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-
-        if "Authorization" in request.headers:
-            auth_header = request.headers["Authorization"]
-            if auth_header.startswith("Bearer "):
-                token = auth_header.split(" ")[1]
-        if not token:
-            return jsonify({"error": "Token missing"}), 401
-
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-
-            request.user_id = payload.get("id")
-            if request.user_id is None:
-                return jsonify({"error": "Invalid token: user_id missing"}), 401
-
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+            authenticate()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 401
 
         return f(*args, **kwargs)
 
@@ -0,0 +1,119 @@
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from cachetools import TLRUCache
+from flask import request, jsonify
+from config.db import env_flag
+
+RATE_LIMIT_ENABLED = env_flag("RATE_LIMIT_ENABLED", True)
+
+
+class MemoryBackend:
+    """
+    Token buckets in process memory. A bucket refills continuously at
+    capacity/period tokens per second and is forgotten once it would be
+    full again, so idle clients cost nothing. Limits are per worker
+    process; set_backend() a shared store (e.g. Redis) to pool them.
+    """
+
+    def __init__(self, maxsize=100_000):
+        # key -> (tokens, updated_at, period)
+        self._buckets = TLRUCache(
+            maxsize=maxsize,
+            ttu=lambda _key, bucket, now: now + bucket[2],
+            timer=time.monotonic,
+        )
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period) -> float:
+        """Take one token; 0 if allowed, else seconds until one is available"""
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (capacity, now, period))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now, period)
+                return 0.0
+            self._buckets[key] = (tokens, now, period)
+            return (1 - tokens) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+_backend = MemoryBackend()
+
+
+def set_backend(backend):
+    """Swap the bucket store; anything with consume(key, capacity, period)"""
+    global _backend
+    _backend = backend
+
+
+def client_ip():
+    # Behind proxies, server.py's ProxyFix (TRUSTED_PROXIES) has already
+    # resolved this from the X-Forwarded-For hops the proxies appended
+    return request.remote_addr or "unknown"
+
+
+def request_email():
+    data = request.get_json(silent=True) or {}
+    email = data.get("email")
+    if not isinstance(email, str) or not email.strip():
+        return None
+    return email.strip().lower()
+
+
+class Limit:
+    """At most `capacity` requests per `period` seconds for each key"""
+
+    def __init__(self, name, key_func, capacity, period):
+        self.name = name
+        self.key_func = key_func
+        self.capacity = capacity
+        self.period = period
+
+
+def per_ip(capacity, period):
+    return Limit("ip", client_ip, capacity, period)
+
+
+def per_email(capacity, period):
+    return Limit("email", request_email, capacity, period)
+
+
+def rate_limit(scope, *limits):
+    """
+    Reject a request with 429 and Retry-After once any of its buckets is
+    empty, before the view (and its password hash or email) runs.
+    `scope` separates the buckets of different endpoints.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if RATE_LIMIT_ENABLED:
+                for limit in limits:
+                    key = limit.key_func()
+                    if key is None:
+                        continue
+                    retry_after = _backend.consume(
+                        f"{scope}:{limit.name}:{key}", limit.capacity, limit.period
+                    )
+                    if retry_after:
+                        response = jsonify(
+                            {"error": "Too many requests, please try again later"}
+                        )
+                        response.headers["Retry-After"] = str(math.ceil(retry_after))
+                        return response, 429
+
+            return f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
@@ -23,7 +23,8 @@ from controllers.admin import (
     user_roles_chart,
     delete_requests_chart,
     jobs_per_category_chart,
-    application_status_chart
+    application_status_chart,
+    db_pool_metrics,
 )
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -58,3 +59,4 @@ admin_bp.get("/user-roles")(admin_required(user_roles_chart))
 admin_bp.get("/delete-requests-chart")(admin_required(delete_requests_chart))
 admin_bp.get("/jobs-per-category")(admin_required(jobs_per_category_chart))
 admin_bp.get("/app-status-chart")(admin_required(application_status_chart))
+admin_bp.get("/db-pool")(admin_required(db_pool_metrics))
@@ -16,8 +16,18 @@ from controllers.resetPassword import (
     reset_password,
 )
 
+from middlewares.rate_limit import rate_limit, per_ip, per_email
+
 auth = Blueprint("auth", __name__)
 
+# Rejected before any password hash or email is computed
+login_limit = rate_limit("login", per_ip(20, 60), per_email(5, 60))
+signup_limit = rate_limit("signup", per_ip(10, 3600))
+forgot_password_limit = rate_limit(
+    "forgot-password", per_ip(5, 900), per_email(3, 3600)
+)
+reset_password_limit = rate_limit("reset-password", per_ip(10, 900))
+
 # Auth routes - using proper Flask blueprint syntax
 auth.add_url_rule("/google", "google_login", google_login, methods=["GET"])
 auth.add_url_rule(
@@ -31,14 +41,14 @@ auth.add_url_rule(
 auth.add_url_rule(
     "/delete-account", "delete-account", delete_account_request, methods=["POST"]
 )
-auth.add_url_rule("/signup", "signup", signup, methods=["POST"])
-auth.add_url_rule("/login", "login", login, methods=["POST"])
+auth.add_url_rule("/signup", "signup", signup_limit(signup), methods=["POST"])
+auth.add_url_rule("/login", "login", login_limit(login), methods=["POST"])
 
 
 auth.add_url_rule(
     "/forgot-password", 
     "forgot-password", 
-    request_password_reset, 
+    forgot_password_limit(request_password_reset), 
     methods=["POST"]
 )
 auth.add_url_rule(
@@ -50,6 +60,6 @@ auth.add_url_rule(
 auth.add_url_rule(
     "/reset-password", 
     "reset-password", 
-    reset_password, 
+    reset_password_limit(reset_password), 
     methods=["POST"]
 )
\ No newline at end of file
@@ -11,7 +11,8 @@ from controllers.job import (
     get_employer_jobs,
     get_skills,
     create_or_get_skill,
-    get_jobs_for_user
+    get_jobs_for_user,
+    get_job_candidates,
 )
 
 job = Blueprint("job", __name__)
@@ -69,6 +70,11 @@ def create_or_get_skill_route():
     return create_or_get_skill()
 
 
+@job.route("/<int:job_id>/candidates", methods=["GET"])
+def get_job_candidates_route(job_id: int):
+    return get_job_candidates(job_id)
+
+
 @job.route("/<int:job_id>/apply", methods=["POST"])
 def apply_to_job_route(job_id: int):
     return apply_to_job(job_id)
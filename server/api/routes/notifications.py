@@ -1,5 +1,12 @@
 from flask import Blueprint
-from controllers.notifications import get_notifications, mark_notification_read
+from controllers.notifications import (
+    get_notifications,
+    get_unread_count,
+    mark_notification_read,
+    mark_all_notifications_read,
+    stream_notifications,
+    create_stream_token,
+)
 
 notifications = Blueprint("notifications", __name__)
 
@@ -10,6 +17,36 @@ notifications.add_url_rule(
     methods=["GET"],
 )
 
+notifications.add_url_rule(
+    "/unread-count",
+    "get_unread_count",
+    get_unread_count,
+    methods=["GET"],
+)
+
+# Each open stream holds a worker thread until the client disconnects;
+# controllers.notifications caps them per user (STREAM_MAX_PER_USER)
+notifications.add_url_rule(
+    "/stream",
+    "stream_notifications",
+    stream_notifications,
+    methods=["GET"],
+)
+
+notifications.add_url_rule(
+    "/stream-token",
+    "create_stream_token",
+    create_stream_token,
+    methods=["POST"],
+)
+
+notifications.add_url_rule(
+    "/read-all",
+    "mark_all_notifications_read",
+    mark_all_notifications_read,
+    methods=["PUT"],
+)
+
 notifications.add_url_rule(
     "/<int:notification_id>/read",
     "mark_notification_read",
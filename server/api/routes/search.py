@@ -1,6 +1,7 @@
 from flask import Blueprint
-from controllers.search import search_all
+from controllers.search import search_all, suggest_terms
 
 search = Blueprint("search", __name__)
 
 search.add_url_rule("", "search_all", search_all, methods=["GET"])
+search.add_url_rule("/suggest", "suggest_terms", suggest_terms, methods=["GET"])
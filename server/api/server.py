@@ -3,35 +3,47 @@ from dotenv import load_dotenv
 
 from flask import Flask, jsonify, send_from_directory, redirect, request
 from flask_cors import CORS
-from config.db import Base, engine
+from werkzeug.middleware.proxy_fix import ProxyFix
+from config.db import init_app as init_db_session
+from core import register_commands
 from routes.auth import auth
 from routes.job import job  # Fixed this line
 from routes.admin import admin_bp  # Fixed this line
 from routes.candidates import candidates
 from routes.employers import employers
 from routes.applications import applications
+from services.email_templates import load_templates
+from services.password_service import PasswordHasherBusy
+from services.upload_service import UPLOAD_DIR, init_app as init_uploads
+from services.worker_service import start_background_workers
 import os
-from pathlib import Path
 
 load_dotenv()
 
-# Get the project root directory (where uploads folder is located)
-# This file is in server/api/, so we go up 2 levels to get to project root
-PROJECT_ROOT = Path(__file__).parent.parent
-UPLOADS_DIR = PROJECT_ROOT / "uploads"
+# Uploads folder (server/uploads unless UPLOAD_DIR is set), written by
+# services.upload_service
+UPLOADS_DIR = UPLOAD_DIR
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
 
+# Number of reverse proxies in front of the app that append to
+# X-Forwarded-For. request.remote_addr (and the per-IP rate limits) then
+# use the address the outermost of them saw; hops a client adds itself
+# are ignored. Leave at 0 when clients connect directly.
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+# Larger request bodies are refused with 413 while they are being read
+init_uploads(app)
 
-def init_db():
-    """Initialize database tables. Call this after the app starts."""
-    try:
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully!")
-    except Exception as e:
-        print(f"Warning: Could not create database tables: {e}")
-        print("Make sure PostgreSQL is running and the database is accessible.")
+# One database session per request, removed on teardown
+init_db_session(app)
+
+# Schema setup is explicit: `flask --app server init-db`. The polling
+# workers (stat rollups, outbound email) run in one process started with
+# `flask --app server run-workers`, never on import
+register_commands(app)
 
 
 print(UPLOADS_DIR)
@@ -60,6 +72,14 @@ app.register_blueprint(connections, url_prefix="/api/connections")
 app.register_blueprint(notifications, url_prefix="/api/notifications")
 app.register_blueprint(search, url_prefix="/api/search")
 
+# Compile the email templates once
+load_templates()
+
+
+
+@app.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
 
 
 @app.route("/")
@@ -75,6 +95,8 @@ def serve_upload(filename):
 
 
 if __name__ == "__main__":
-    # Initialize database tables when running directly
-    init_db()
+    # Local development runs the workers in-process; only in the reloader's
+    # child, which serves the requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_workers()
     app.run(debug=True)
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, literal_column, select
+from core.models import User, Job, Application
+
+
+BUCKETS = ("day", "week", "month")
+
+# Upper bound on points per series, e.g. ~2.7 years of days
+MAX_BUCKETS = 1000
+
+_BUCKET_DAYS = {"day": 1, "week": 7, "month": 28}
+
+# series name -> timestamp column counted in each bucket
+SERIES = {
+    "users": User.created_at,
+    "jobs": Job.created_at,
+    "applicants": Application.applied_at,
+}
+
+
+def _date_trunc(bucket: str, column):
+    # bucket is whitelisted; inlining it keeps the expression identical in
+    # SELECT and GROUP BY, which bound parameters would not
+    return func.date_trunc(literal_column(f"'{bucket}'"), column)
+
+
+def time_series(db, bucket: str = "day", start: datetime = None, end: datetime = None):
+    """
+    Count users, jobs and applications per bucket for every bucket from
+    start to end (end defaulting to today) in a single query. The
+    buckets come from generate_series() and are left-joined to one
+    GROUP BY per table, so empty buckets come back as zeros from SQL.
+    Returns [{"date", "users", "jobs", "applicants"}] in date order.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Invalid bucket. Must be one of: {', '.join(BUCKETS)}")
+
+    end = end or datetime.today()
+    start = start or end - timedelta(days=90)
+    if start > end:
+        raise ValueError("start must be before end")
+    if (end - start).days / _BUCKET_DAYS[bucket] > MAX_BUCKETS:
+        raise ValueError(f"Range too large: at most {MAX_BUCKETS} {bucket}s")
+
+    # Whole buckets: a week series starting on a Wednesday counts from Monday
+    step = literal_column(f"interval '1 {bucket}'")
+    first_bucket = _date_trunc(bucket, start)
+    last_bucket = _date_trunc(bucket, end)
+
+    buckets = select(
+        func.generate_series(first_bucket, last_bucket, step).label("bucket")
+    ).subquery("buckets")
+
+    stmt = select(buckets.c.bucket)
+    for name, column in SERIES.items():
+        counts = (
+            select(
+                _date_trunc(bucket, column).label("bucket"),
+                func.count().label("total"),
+            )
+            .where(column >= first_bucket, column < last_bucket + step)
+            .group_by(_date_trunc(bucket, column))
+            .subquery(name)
+        )
+        stmt = stmt.outerjoin(counts, counts.c.bucket == buckets.c.bucket).add_columns(
+            func.coalesce(counts.c.total, 0).label(name)
+        )
+
+    rows = db.execute(stmt.order_by(buckets.c.bucket)).all()
+    return [
+        {
+            "date": row.bucket.isoformat(),
+            **{name: getattr(row, name) for name in SERIES},
+        }
+        for row in rows
+    ]
@@ -1,15 +1,89 @@
-from config.db import SessionLocal
-from core.models import Application, Job, User
+from config.db import get_db
+from core.models import Application, Job, User, job_applicants
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
 from datetime import datetime
 
 
+def link_applicant(session, job_id: int, user_id: int) -> bool:
+    """
+    Record user_id as an applicant of job_id and bump Job.applicants_count
+    in the same transaction. Returns False if the link already existed.
+    """
+    inserted = session.execute(
+        insert(job_applicants)
+        .values(job_id=job_id, user_id=user_id)
+        .on_conflict_do_nothing()
+    ).rowcount
+    if inserted:
+        _adjust_applicants_count(session, {job_id: inserted})
+    return bool(inserted)
+
+
+def unlink_applicant(session, job_id: int, user_id: int) -> bool:
+    """Remove an applicant link and decrement the job's counter"""
+    deleted = session.execute(
+        delete(job_applicants).where(
+            job_applicants.c.job_id == job_id, job_applicants.c.user_id == user_id
+        )
+    ).rowcount
+    if deleted:
+        _adjust_applicants_count(session, {job_id: -deleted})
+    return bool(deleted)
+
+
+def unlink_user_applications(session, user_id: int):
+    """Remove every applicant link of a user, decrementing each job once"""
+    job_ids = session.scalars(
+        delete(job_applicants)
+        .where(job_applicants.c.user_id == user_id)
+        .returning(job_applicants.c.job_id)
+    ).all()
+    _adjust_applicants_count(session, {job_id: -1 for job_id in job_ids})
+    return job_ids
+
+
+def _adjust_applicants_count(session, deltas: dict):
+    # Relative UPDATE so concurrent applies never lose an increment
+    for job_id, delta in deltas.items():
+        session.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(
+                applicants_count=func.greatest(Job.applicants_count + delta, 0),
+                updated_at=Job.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def reconcile_applicant_counts(session) -> int:
+    """
+    Reset Job.applicants_count from job_applicants wherever they drifted
+    apart. Returns the number of jobs fixed; the caller commits.
+    """
+    actual = (
+        select(func.count())
+        .select_from(job_applicants)
+        .where(job_applicants.c.job_id == Job.id)
+        .scalar_subquery()
+    )
+    result = session.execute(
+        update(Job)
+        .where(Job.applicants_count != actual)
+        .values(applicants_count=actual, updated_at=Job.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
 def candidate_apply_for_job(
     job_id: int, user_id: int, cover_letter: str = None, resume_url: str = None
 ):
     """
     Candidate applies for a job
     """
-    session = SessionLocal()
+    session = get_db()
     try:
         # Check if job exists
         job = session.query(Job).filter(Job.id == job_id).first()
@@ -44,86 +118,74 @@ def candidate_apply_for_job(
         )
 
         session.add(application)
+        link_applicant(session, job_id, user_id)
         session.commit()
 
         return application_to_dict(application), None
     except Exception as e:
         session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 
 def get_all_applications():
     """
     Get all applications (admin/employer view)
     """
-    session = SessionLocal()
-    try:
-        applications = session.query(Application).all()
-        result = []
-        for app in applications:
-            result.append(application_to_dict(app))
-        return result
-    finally:
-        session.close()
+    session = get_db()
+    applications = session.query(Application).all()
+    result = []
+    for app in applications:
+        result.append(application_to_dict(app))
+    return result
 
 
 def get_candidate_applications(candidate_id: int):
     """
     Get all applications for a specific candidate
     """
-    session = SessionLocal()
-    try:
-        # Verify candidate exists
-        candidate = (
-            session.query(User)
-            .filter(User.id == candidate_id, User.role == "candidate")
-            .first()
-        )
-        if not candidate:
-            return None, "Candidate not found"
+    session = get_db()
+    # Verify candidate exists
+    candidate = (
+        session.query(User)
+        .filter(User.id == candidate_id, User.role == "candidate")
+        .first()
+    )
+    if not candidate:
+        return None, "Candidate not found"
 
-        applications = (
-            session.query(Application).filter(Application.user_id == candidate_id).all()
-        )
+    applications = (
+        session.query(Application).filter(Application.user_id == candidate_id).all()
+    )
 
-        result = []
-        for app in applications:
-            result.append(application_to_dict(app))
-        return result, None
-    finally:
-        session.close()
+    result = []
+    for app in applications:
+        result.append(application_to_dict(app))
+    return result, None
 
 
 def get_job_applicants(job_id: int):
     """
     Get all applicants for a specific job
     """
-    session = SessionLocal()
-    try:
-        # Verify job exists
-        job = session.query(Job).filter(Job.id == job_id).first()
-        if not job:
-            return None, "Job not found"
+    session = get_db()
+    # Verify job exists
+    job = session.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        return None, "Job not found"
 
-        applications = (
-            session.query(Application).filter(Application.job_id == job_id).all()
-        )
+    applications = session.query(Application).filter(Application.job_id == job_id).all()
 
-        result = []
-        for app in applications:
-            result.append(application_to_dict(app))
-        return result, None
-    finally:
-        session.close()
+    result = []
+    for app in applications:
+        result.append(application_to_dict(app))
+    return result, None
 
 
 def update_application_status(application_id: int, status: str):
     """
     Update application status (pending, reviewed, accepted, rejected)
     """
-    session = SessionLocal()
+    session = get_db()
     try:
         valid_statuses = ["pending", "reviewed", "accepted", "rejected"]
         if status not in valid_statuses:
@@ -142,31 +204,26 @@ def update_application_status(application_id: int, status: str):
     except Exception as e:
         session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 
 def get_application_by_id(application_id: int):
     """
     Get a specific application by ID
     """
-    session = SessionLocal()
-    try:
-        application = (
-            session.query(Application).filter(Application.id == application_id).first()
-        )
-        if not application:
-            return None, "Application not found"
-        return application_to_dict(application), None
-    finally:
-        session.close()
+    session = get_db()
+    application = (
+        session.query(Application).filter(Application.id == application_id).first()
+    )
+    if not application:
+        return None, "Application not found"
+    return application_to_dict(application), None
 
 
 def delete_application(application_id: int):
     """
     Delete an application
     """
-    session = SessionLocal()
+    session = get_db()
     try:
         application = (
             session.query(Application).filter(Application.id == application_id).first()
@@ -174,14 +231,13 @@ def delete_application(application_id: int):
         if not application:
             return None, "Application not found"
 
+        unlink_applicant(session, application.job_id, application.user_id)
         session.delete(application)
         session.commit()
         return True, None
     except Exception as e:
         session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 
 def application_to_dict(application: Application) -> dict:
@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from sqlalchemy import func
+from core.models import User, Job, Skill, Category
+
+
+SUGGESTION_KINDS = ("job_title", "company", "skill", "category")
+
+SUGGESTION_LIMIT = 8
+
+# Full rebuild interval; catches writes made by other worker processes
+REBUILD_INTERVAL = int(os.getenv("AUTOCOMPLETE_REBUILD_SECONDS", 600))
+
+
+def normalize(value: str) -> str:
+    return " ".join((value or "").lower().split())
+
+
+class PrefixIndex:
+    """
+    In-memory prefix index: a sorted array of (term, kind, value) entries
+    searched with bisect. Every word start of a value is indexed, so
+    "dev" finds "Senior Developer". Values are reference counted because
+    the same title or company usually comes from many rows.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._refs = Counter()
+        self._lock = threading.RLock()
+        self.built_at = None
+
+    @staticmethod
+    def _terms(value: str):
+        words = normalize(value).split(" ")
+        return {" ".join(words[i:]) for i in range(len(words)) if words[i]}
+
+    def _insert(self, kind: str, value: str):
+        for term in self._terms(value):
+            insort(self._entries, (term, kind, value))
+
+    def _delete(self, kind: str, value: str):
+        for term in self._terms(value):
+            entry = (term, kind, value)
+            pos = bisect_left(self._entries, entry)
+            if pos < len(self._entries) and self._entries[pos] == entry:
+                del self._entries[pos]
+
+    def load(self, counts: Counter):
+        """Replace the whole index from {(kind, value): reference_count}"""
+        entries = []
+        for kind, value in counts:
+            entries.extend((term, kind, value) for term in self._terms(value))
+        entries.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._refs = Counter(counts)
+            self.built_at = time.monotonic()
+
+    def add(self, kind: str, value: str):
+        if not value or not value.strip():
+            return
+        with self._lock:
+            key = (kind, value)
+            self._refs[key] += 1
+            if self._refs[key] == 1:
+                self._insert(kind, value)
+
+    def remove(self, kind: str, value: str):
+        if not value:
+            return
+        with self._lock:
+            key = (kind, value)
+            if key not in self._refs:
+                return
+            self._refs[key] -= 1
+            if self._refs[key] <= 0:
+                del self._refs[key]
+                self._delete(kind, value)
+
+    def search(self, prefix: str, limit: int = SUGGESTION_LIMIT):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            pos = bisect_left(self._entries, (prefix,))
+            while pos < len(self._entries) and len(results) < limit:
+                term, kind, value = self._entries[pos]
+                if not term.startswith(prefix):
+                    break
+                if (kind, value) not in seen:
+                    seen.add((kind, value))
+                    results.append({"type": kind, "value": value})
+                pos += 1
+        return results
+
+
+suggestion_index = PrefixIndex()
+
+# One rebuild at a time; see ensure_index()
+_rebuild_lock = threading.Lock()
+
+# Hook calls made while a rebuild reads the database, replayed onto the
+# new index before it replaces the current one. None when not rebuilding.
+_changes_during_rebuild = None
+_changes_lock = threading.Lock()
+
+
+def _load_counts(db) -> Counter:
+    counts = Counter()
+
+    for title, count in db.query(Job.title, func.count(Job.id)).group_by(Job.title):
+        counts[("job_title", title)] += count
+    for company, count in db.query(Job.company, func.count(Job.id)).group_by(
+        Job.company
+    ):
+        counts[("company", company)] += count
+    for company, count in (
+        db.query(User.companyName, func.count(User.id))
+        .filter(User.companyName.isnot(None))
+        .group_by(User.companyName)
+    ):
+        counts[("company", company)] += count
+    for (name,) in db.query(Skill.name):
+        counts[("skill", name)] += 1
+    for (name,) in db.query(Category.name):
+        counts[("category", name)] += 1
+
+    return Counter(
+        {key: count for key, count in counts.items() if key[1] and key[1].strip()}
+    )
+
+
+def _is_fresh(index) -> bool:
+    return (
+        index.built_at is not None
+        and time.monotonic() - index.built_at <= REBUILD_INTERVAL
+    )
+
+
+def ensure_index(db):
+    """
+    Build the index on first use and rebuild it every REBUILD_INTERVAL.
+    A rebuild fills a new index and swaps it in; only one request runs
+    it while the others keep searching the current index (or wait for
+    it, before the first build).
+    """
+    global suggestion_index, _changes_during_rebuild
+    if _is_fresh(suggestion_index):
+        return
+
+    first_build = suggestion_index.built_at is None
+    if not _rebuild_lock.acquire(blocking=first_build):
+        return
+    try:
+        if _is_fresh(suggestion_index):
+            return
+
+        with _changes_lock:
+            _changes_during_rebuild = []
+        index = PrefixIndex()
+        try:
+            index.load(_load_counts(db))
+        finally:
+            with _changes_lock:
+                changes, _changes_during_rebuild = _changes_during_rebuild, None
+                if index.built_at is not None:
+                    for method, kind, value in changes:
+                        getattr(index, method)(kind, value)
+                    suggestion_index = index
+    finally:
+        _rebuild_lock.release()
+
+
+def suggest(db, prefix: str, limit: int = SUGGESTION_LIMIT):
+    ensure_index(db)
+    return suggestion_index.search(prefix, limit)
+
+
+# Incremental updates, called by controllers after a successful commit.
+# Before the first build they are no-ops: the build reads the database.
+
+
+def _apply(method: str, kind: str, value: str):
+    with _changes_lock:
+        if _changes_during_rebuild is not None:
+            _changes_during_rebuild.append((method, kind, value))
+        index = suggestion_index
+    if index.built_at is not None:
+        getattr(index, method)(kind, value)
+
+
+def add_suggestion(kind: str, value: str):
+    _apply("add", kind, value)
+
+
+def remove_suggestion(kind: str, value: str):
+    _apply("remove", kind, value)
+
+
+def rename_suggestion(kind: str, old_value: str, new_value: str):
+    if old_value == new_value:
+        return
+    remove_suggestion(kind, old_value)
+    add_suggestion(kind, new_value)
@@ -1,135 +1,194 @@
+import logging
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+import time
+from datetime import timedelta
+
 from dotenv import load_dotenv
+from sqlalchemy import func, select
+from config.db import SessionLocal
+from core.models import OutboundEmail
+from services.email_templates import render_email
+from services.mail_backends import (
+    build_message,
+    SMTPBackend,
+    FileBackend,
+    ConsoleBackend,
+)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Email configuration
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", 30))
 FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USER)
 APP_NAME = os.getenv("APP_NAME", "Hire Radar")
 
+# smtp, file (one .eml per message in MAIL_FILE_DIR) or console
+MAIL_BACKEND = os.getenv("MAIL_BACKEND", "smtp")
+MAIL_FILE_DIR = os.getenv("MAIL_FILE_DIR", "mail_outbox")
+
+# Background sender: poll period (0 disables the thread) and batch size
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", 5))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+
+# Failed sends are retried after 30s, 60s, 120s, ... then marked failed
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", 30))
 
-def send_email(to_email, subject, html_content):
+
+def get_backend(name=None):
+    """Mail backend selected by MAIL_BACKEND"""
+    name = name or MAIL_BACKEND
+    if name == "smtp":
+        return SMTPBackend(
+            SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, timeout=SMTP_TIMEOUT
+        )
+    if name == "file":
+        return FileBackend(MAIL_FILE_DIR)
+    if name == "console":
+        return ConsoleBackend()
+    raise ValueError(f"Unknown MAIL_BACKEND: {name}")
+
+
+def send_email(to_email, subject, html_content, text_content=None):
     """
-    Send an email using SMTP.
+    Send an email right away, bypassing the queue (scripts, debugging).
+    Requests should use queue_email().
     """
+    backend = get_backend()
     try:
-        # Create message
-        message = MIMEMultipart("alternative")
-        message["Subject"] = subject
-        message["From"] = FROM_EMAIL
-        message["To"] = to_email
-
-        # Add HTML content
-        html_part = MIMEText(html_content, "html")
-        message.attach(html_part)
-
-        # Send email
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(FROM_EMAIL, to_email, message.as_string())
-
+        message = build_message(
+            FROM_EMAIL, to_email, subject, html_content, text_content
+        )
+        backend.send(FROM_EMAIL, to_email, message)
         print(f"Email sent successfully to {to_email}")
         return True
 
     except Exception as e:
         print(f"Error sending email: {str(e)}")
         return False
+    finally:
+        backend.close()
 
 
-def send_reset_email(to_email, user_name, reset_url):
+def queue_email(db, to_email, subject, html_content, text_content=None):
     """
-    Send password reset email with styled HTML template.
+    Add an email to the outbound queue in the caller's transaction. It is
+    sent by the background sender (flask run-workers) within
+    MAIL_POLL_SECONDS of the commit, so request latency does not depend on
+    the SMTP server.
     """
-    subject = f"Reset Your {APP_NAME} Password"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: Arial, sans-serif; background-color: #f4f4f4;">
-        <table width="100%" cellpadding="0" cellspacing="0" style="background-color: white; padding: 20px;">
-            <tr>
-                <td align="center">
-                    <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                        <!-- Header -->
-                        <tr>
-                            <td style="background-color: black; padding: 30px; text-align: center;">
-                                <h1 style="color: #ffffff; margin: 0; font-size: 28px;">{APP_NAME}</h1>
-                            </td>
-                        </tr>
-                        
-                        <!-- Content -->
-                        <tr>
-                            <td style="padding: 40px 30px;">
-                                <h2 style="color: #333333; margin: 0 0 20px 0; font-size: 24px;">
-                                    Reset Your Password
-                                </h2>
-                                
-                                <p style="color: #666666; font-size: 16px; line-height: 1.6; margin: 0 0 20px 0;">
-                                    Hi {user_name},
-                                </p>
-                                
-                                <p style="color: #666666; font-size: 16px; line-height: 1.6; margin: 0 0 20px 0;">
-                                    We received a request to reset your password. Click the button below to create a new password:
-                                </p>
-                                
-                                <!-- Button -->
-                                <table width="100%" cellpadding="0" cellspacing="0" style="margin: 30px 0;">
-                                    <tr>
-                                        <td align="center">
-                                            <a href="{reset_url}" 
-                                               style="display: inline-block; padding: 14px 40px; background-color: black; color: #ffffff; text-decoration: none; border-radius: 6px; font-size: 16px; font-weight: bold;">
-                                                Reset Password
-                                            </a>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                <p style="color: #666666; font-size: 14px; line-height: 1.6; margin: 20px 0 0 0;">
-                                    Or copy and paste this link into your browser:
-                                </p>
-                                <p style="color: #4F46E5; font-size: 14px; word-break: break-all; margin: 10px 0 20px 0;">
-                                    {reset_url}
-                                </p>
-                                
-                                <p style="color: #666666; font-size: 14px; line-height: 1.6; margin: 20px 0 0 0;">
-                                    This link will expire in 1 hour for security reasons.
-                                </p>
-                                
-                                <p style="color: #666666; font-size: 14px; line-height: 1.6; margin: 20px 0 0 0;">
-                                    If you didn't request this password reset, please ignore this email or contact support if you have concerns.
-                                </p>
-                            </td>
-                        </tr>
-                        
-                        <!-- Footer -->
-                        <tr>
-                            <td style="background-color: #f9f9f9; padding: 20px 30px; text-align: center; border-top: 1px solid #eeeeee;">
-                                <p style="color: #999999; font-size: 12px; margin: 0; line-height: 1.6;">
-                                    © 2024 {APP_NAME}. All rights reserved.
-                                </p>
-                                <p style="color: #999999; font-size: 12px; margin: 10px 0 0 0;">
-                                    This is an automated email, please do not reply.
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
+    email = OutboundEmail(
+        to_email=to_email,
+        subject=subject,
+        html_body=html_content,
+        text_body=text_content,
+    )
+    db.add(email)
+    return email
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def send_queued_emails(db, backend=None, limit=None) -> int:
+    """
+    Send one batch of due emails over a single backend connection. The
+    rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can
+    run this at once without sending twice. Commits. Returns the number
+    of emails processed (sent or rescheduled).
+    """
+    # Database clock, the same one that fills send_after
+    now = db.scalar(select(func.localtimestamp()))
+    batch = db.scalars(
+        select(OutboundEmail)
+        .where(OutboundEmail.status == "pending", OutboundEmail.send_after <= now)
+        .order_by(OutboundEmail.id)
+        .limit(limit or MAIL_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not batch:
+        db.rollback()
+        return 0
+
+    backend = backend or get_backend()
+    try:
+        backend.open()
+    except Exception:
+        # Server unreachable: release the rows, the next poll retries
+        db.rollback()
+        raise
+
+    try:
+        for email in batch:
+            email.attempts += 1
+            message = build_message(
+                FROM_EMAIL,
+                email.to_email,
+                email.subject,
+                email.html_body,
+                email.text_body,
+            )
+            try:
+                backend.send(FROM_EMAIL, email.to_email, message)
+            except Exception as e:
+                email.last_error = str(e)
+                if email.attempts >= MAIL_MAX_ATTEMPTS:
+                    email.status = "failed"
+                else:
+                    email.send_after = now + _retry_delay(email.attempts)
+                logger.warning("Sending email %s failed: %s", email.id, e)
+            else:
+                email.status = "sent"
+                email.sent_at = now
+                email.last_error = None
+    finally:
+        backend.close()
+        db.commit()
+
+    return len(batch)
+
+
+def _send_loop():
+    while True:
+        db = SessionLocal()
+        try:
+            # Drain full batches before waiting again
+            while send_queued_emails(db) >= MAIL_BATCH_SIZE:
+                pass
+        except Exception:
+            db.rollback()
+            logger.exception("Outbound email batch failed")
+        finally:
+            db.close()
+        time.sleep(MAIL_POLL_SECONDS)
+
+
+_sender = None
+
+
+def start_email_sender():
+    """Start the background sender thread once per process"""
+    global _sender
+    if MAIL_POLL_SECONDS <= 0 or _sender is not None:
+        return
+    _sender = threading.Thread(target=_send_loop, name="email-sender", daemon=True)
+    _sender.start()
+
+
+def send_reset_email(db, to_email, user_name, reset_url):
+    """
+    Queue the password reset email (templates/email/reset_password.*).
     """
-    
-    return send_email(to_email, subject, html_content)
\ No newline at end of file
+    subject = f"Reset Your {APP_NAME} Password"
+    html_content, text_content = render_email(
+        "reset_password", user_name=user_name, reset_url=reset_url
+    )
+    return queue_email(db, to_email, subject, html_content, text_content)
@@ -0,0 +1,93 @@
+import os
+import re
+from datetime import date
+from html.parser import HTMLParser
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound, select_autoescape
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates" / "email"
+
+# Compiled templates stay cached for the life of the process. Only check
+# the files for edits when developing.
+_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR)),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=os.getenv("FLASK_ENV") == "development",
+    cache_size=-1,
+    keep_trailing_newline=True,
+)
+_env.globals.update(app_name=os.getenv("APP_NAME", "Hire Radar"))
+
+
+def load_templates():
+    """Compile every email template up front, e.g. at server startup"""
+    for name in _env.list_templates(extensions=["html", "txt"]):
+        _env.get_template(name)
+
+
+class _TextExtractor(HTMLParser):
+    BLOCK_TAGS = {"br", "p", "div", "tr", "table", "h1", "h2", "h3", "li"}
+    SKIP_TAGS = {"head", "style", "script", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.links = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skipping += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag == "a":
+            self.links.append(dict(attrs).get("href"))
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag == "a" and self.links:
+            href = self.links.pop()
+            if href:
+                self.parts.append(f" ({href})")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """Plain-text fallback for an HTML email without a .txt template"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+
+    lines = (
+        re.sub(r"[ \t\r\f\v]+", " ", line).strip()
+        for line in "".join(parser.parts).split("\n")
+    )
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+
+# Emails without a .txt template, so the loader is not asked again
+_html_only = set()
+
+
+def render_email(name, **context):
+    """
+    Render templates/email/<name>.html and its plain-text part, from
+    <name>.txt when it exists or converted from the HTML otherwise.
+    Returns (html, text).
+    """
+    # The year changes under a long-running process, so it is not a global
+    context.setdefault("year", date.today().year)
+    html = _env.get_template(f"{name}.html").render(**context)
+    if name not in _html_only:
+        try:
+            return html, _env.get_template(f"{name}.txt").render(**context)
+        except TemplateNotFound:
+            _html_only.add(name)
+    return html, html_to_text(html)
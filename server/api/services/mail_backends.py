@@ -0,0 +1,99 @@
+import os
+import smtplib
+import uuid
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+
+def build_message(from_email, to_email, subject, html_content, text_content=None):
+    """multipart/alternative message, plain text first when given"""
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = from_email
+    message["To"] = to_email
+
+    if text_content:
+        message.attach(MIMEText(text_content, "plain"))
+    message.attach(MIMEText(html_content, "html"))
+    return message
+
+
+class SMTPBackend:
+    """
+    Sends over one authenticated SMTP connection, opened on first use and
+    kept until close(), so a batch pays for STARTTLS and login once.
+    """
+
+    def __init__(self, host, port, user=None, password=None, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.connection = None
+
+    def open(self):
+        if self.connection is not None:
+            return
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.starttls()
+            if self.user:
+                connection.login(self.user, self.password)
+        except Exception:
+            connection.close()
+            raise
+        self.connection = connection
+
+    def close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.quit()
+        except smtplib.SMTPException:
+            self.connection.close()
+        finally:
+            self.connection = None
+
+    def send(self, from_email, to_email, message):
+        self.open()
+        try:
+            self.connection.sendmail(from_email, to_email, message.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # Idle connection dropped by the server; reconnect once
+            self.connection = None
+            self.open()
+            self.connection.sendmail(from_email, to_email, message.as_string())
+
+
+class FileBackend:
+    """Writes each message to <directory>/<timestamp>-<id>.eml (dev, tests)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def close(self):
+        pass
+
+    def send(self, from_email, to_email, message):
+        self.open()
+        name = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.eml"
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+            f.write(message.as_string())
+
+
+class ConsoleBackend:
+    """Prints each message to stdout"""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, from_email, to_email, message):
+        print(message.as_string())
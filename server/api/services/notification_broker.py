@@ -0,0 +1,134 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Messages for one connected client, read by its stream"""
+
+    def __init__(self, user_id, maxsize=100):
+        self.user_id = user_id
+        self.messages = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """Next message, or None after `timeout` seconds"""
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class InProcessBroker:
+    """
+    Pub/sub between request threads of one process. Enough for a single
+    worker; PostgresBroker relays it across processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, user_id, limit=None):
+        """
+        New subscription for a user, or None when they already have
+        `limit` open in this process
+        """
+        subscription = Subscription(user_id)
+        with self._lock:
+            subscriptions = self._subscriptions.setdefault(user_id, set())
+            if limit is not None and len(subscriptions) >= limit:
+                return None
+            subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def deliver(self, user_id, payload):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.messages.put_nowait(payload)
+            except queue.Full:
+                # Stalled client; it catches up from the feed on reconnect
+                logger.warning("Dropping notification for user %s", user_id)
+
+    def publish(self, messages):
+        """Deliver (user_id, payload) pairs"""
+        for user_id, payload in messages:
+            self.deliver(user_id, payload)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Publishes with pg_notify() and runs one LISTEN thread per process that
+    delivers to that process's subscribers, so every worker sees every
+    notification.
+    """
+
+    CHANNEL = "notifications"
+
+    def __init__(self, engine, dsn):
+        super().__init__()
+        self.engine = engine
+        self.dsn = dsn
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, messages):
+        """NOTIFY every (user_id, payload) pair in one transaction"""
+        params = [
+            (self.CHANNEL, json.dumps({"user_id": user_id, "payload": payload}))
+            for user_id, payload in messages
+        ]
+        if not params:
+            return
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("SELECT pg_notify(%s, %s)", params)
+
+    def subscribe(self, user_id, limit=None):
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="notification-listener", daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(user_id, limit)
+
+    def _listen(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(self.dsn)
+                connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+
+                while True:
+                    if select.select([connection], [], [], 60) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        message = json.loads(connection.notifies.pop(0).payload)
+                        self.deliver(message["user_id"], message["payload"])
+            except Exception:
+                logger.exception("Notification listener disconnected")
+                time.sleep(5)
+            finally:
+                if connection is not None:
+                    connection.close()
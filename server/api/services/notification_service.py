@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import cast, event, insert, literal, select
+from config.db import DATABASE_URL, SessionLocal, engine
+from core.models import (
+    Job,
+    Notification,
+    NotificationFanout,
+    User,
+    job_skills,
+    user_skills,
+)
+from services.notification_broker import InProcessBroker, PostgresBroker
+
+logger = logging.getLogger(__name__)
+
+
+# Notifications inserted (and committed) per statement
+FANOUT_CHUNK_SIZE = int(os.getenv("NOTIFICATION_FANOUT_CHUNK_SIZE", 1000))
+
+# Background fan-out poll period; 0 disables the thread
+FANOUT_POLL_SECONDS = float(os.getenv("NOTIFICATION_FANOUT_POLL_SECONDS", 5))
+
+# memory (single process) or postgres (LISTEN/NOTIFY across workers)
+NOTIFICATION_BROKER = os.getenv("NOTIFICATION_BROKER", "memory")
+
+
+def sender_to_dict(sender):
+    if sender is None:
+        return None
+    return {"id": sender.id, "full_name": sender.full_name, "image": sender.image}
+
+
+def notification_to_dict(notif):
+    return {
+        "id": notif.id,
+        "sender_id": notif.sender_id,
+        "receiver_id": notif.receiver_id,
+        "type": notif.type,
+        "title": notif.title,
+        "message": notif.message,
+        "is_read": notif.is_read,
+        "created_at": notif.created_at.isoformat(),
+        "sender": sender_to_dict(notif.sender),
+    }
+
+
+# ============================================================
+# PUSH (SSE stream subscribers)
+# ============================================================
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker selected by NOTIFICATION_BROKER"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            if NOTIFICATION_BROKER == "postgres":
+                _broker = PostgresBroker(engine, DATABASE_URL)
+            elif NOTIFICATION_BROKER == "memory":
+                _broker = InProcessBroker()
+            else:
+                raise ValueError(f"Unknown NOTIFICATION_BROKER: {NOTIFICATION_BROKER}")
+        return _broker
+
+
+def publish(payloads):
+    """Push notification dicts to their receivers' open streams"""
+    try:
+        get_broker().publish(
+            [(payload["receiver_id"], payload) for payload in payloads]
+        )
+    except Exception:
+        # Push is best effort, the feed still has the rows
+        logger.exception("Publishing notifications failed")
+
+
+_PENDING_KEY = "pending_notifications"
+
+
+def _publish_pending(session):
+    publish(session.info.pop(_PENDING_KEY, []))
+
+
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def publish_after_commit(db, *notifications):
+    """
+    Push new Notification rows once db commits; dropped on rollback.
+    Flushes so ids and created_at are known before the commit.
+    """
+    db.flush()
+    pending = db.info.setdefault(_PENDING_KEY, [])
+    pending.extend(notification_to_dict(n) for n in notifications)
+
+    if not event.contains(db, "after_commit", _publish_pending):
+        event.listen(db, "after_commit", _publish_pending)
+        event.listen(db, "after_rollback", _discard_pending)
+
+
+# ============================================================
+# job_posted FAN-OUT
+# ============================================================
+def _job_posted_chunk(job, after_user_id):
+    """
+    INSERT ... SELECT of job_posted notifications for the next chunk of
+    candidates (by id, after after_user_id) sharing a skill with the job.
+    """
+    receivers = (
+        select(user_skills.c.user_id)
+        .join(job_skills, job_skills.c.skill_id == user_skills.c.skill_id)
+        .join(User, User.id == user_skills.c.user_id)
+        .where(
+            job_skills.c.job_id == job.id,
+            User.role == "candidate",
+            user_skills.c.user_id > after_user_id,
+        )
+        .distinct()
+        .order_by(user_skills.c.user_id)
+        .limit(FANOUT_CHUNK_SIZE)
+        .subquery("receivers")
+    )
+
+    title = f"New job matching your skills: {job.title}"
+    message = f'{job.company or "A company"} posted "{job.title}"'
+    if job.location:
+        message += f" in {job.location}"
+
+    rows = select(
+        literal(job.employer_id),
+        receivers.c.user_id,
+        cast(literal("job_posted"), Notification.type.type),
+        literal(title),
+        literal(message),
+    )
+    return (
+        insert(Notification)
+        .from_select(["sender_id", "receiver_id", "type", "title", "message"], rows)
+        .returning(
+            Notification.id,
+            Notification.receiver_id,
+            Notification.title,
+            Notification.message,
+            Notification.created_at,
+        )
+    )
+
+
+def queue_job_posted(db, job_id):
+    """
+    Record a new job for the background fan-out in the caller's
+    transaction, so the employer's request returns right away and the
+    notifications are still sent if a process dies before finishing.
+    """
+    db.add(NotificationFanout(job_id=job_id))
+
+
+def fan_out_next_chunk(db) -> bool:
+    """
+    Notify the next chunk of candidates for one pending job. The fan-out
+    row is claimed with FOR UPDATE SKIP LOCKED and advanced in the same
+    transaction as the INSERT ... SELECT, so a chunk is sent once even
+    with several workers or after a crash. Commits, then pushes. Returns
+    False when nothing is pending.
+    """
+    fanout = db.scalars(
+        select(NotificationFanout)
+        .order_by(NotificationFanout.created_at, NotificationFanout.job_id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if fanout is None:
+        db.rollback()
+        return False
+
+    job = db.get(Job, fanout.job_id)
+    rows = db.execute(_job_posted_chunk(job, fanout.after_user_id)).all()
+    if len(rows) < FANOUT_CHUNK_SIZE:
+        db.delete(fanout)
+    else:
+        fanout.after_user_id = max(row.receiver_id for row in rows)
+    db.commit()
+
+    sender = sender_to_dict(job.employer)
+    publish(
+        {
+            "id": row.id,
+            "sender_id": job.employer_id,
+            "receiver_id": row.receiver_id,
+            "type": "job_posted",
+            "title": row.title,
+            "message": row.message,
+            "is_read": 0,
+            "created_at": row.created_at.isoformat(),
+            "sender": sender,
+        }
+        for row in rows
+    )
+    return True
+
+
+def _fanout_loop():
+    while True:
+        db = SessionLocal()
+        try:
+            # Drain pending jobs before waiting again
+            while fan_out_next_chunk(db):
+                pass
+        except Exception:
+            db.rollback()
+            logger.exception("job_posted fan-out failed")
+        finally:
+            db.close()
+        time.sleep(FANOUT_POLL_SECONDS)
+
+
+_worker = None
+
+
+def start_notification_fanout():
+    """Start the background fan-out thread once per process"""
+    global _worker
+    if FANOUT_POLL_SECONDS <= 0 or _worker is not None:
+        return
+    _worker = threading.Thread(
+        target=_fanout_loop, name="notification-fanout", daemon=True
+    )
+    _worker.start()
@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Any werkzeug method with its cost parameters, e.g. "scrypt:32768:8:1"
+# (n, r, p) or "pbkdf2:sha256:600000" (iterations). Stored hashes made
+# with other parameters are upgraded on the next successful login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", 16))
+
+# Hashing threads; scrypt and pbkdf2 release the GIL, so this bounds the
+# cores logins can take from the rest of the API
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", max((os.cpu_count() or 2) // 2, 1))
+)
+
+# How long a request waits for a hashing thread before giving up
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing thread stayed busy for PASSWORD_HASH_TIMEOUT"""
+
+
+def _method_of(password_hash: str) -> str:
+    return password_hash.split("$", 1)[0]
+
+
+# werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1"),
+# so compare stored hashes against the expanded form
+CURRENT_METHOD = _method_of(
+    generate_password_hash("", method=PASSWORD_HASH_METHOD, salt_length=1)
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+
+
+def _run(fn, *args):
+    future = _executor.submit(fn, *args)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise PasswordHasherBusy("Password hashing is overloaded, try again later")
+
+
+def hash_password(password: str) -> str:
+    return _run(
+        generate_password_hash,
+        password,
+        PASSWORD_HASH_METHOD,
+        PASSWORD_SALT_LENGTH,
+    )
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    if not password_hash or password is None:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when the hash was made with another method or cost"""
+    return _method_of(password_hash) != CURRENT_METHOD
@@ -0,0 +1,84 @@
+import random
+
+from sqlalchemy import and_, exists, func, or_, select
+from core.models import User, ConnectionRequest, user_skills
+
+
+SAMPLE_SIZE = 5
+
+# Rows fetched per probe; the sample is drawn from this pool so two calls
+# starting near the same id still return different people
+POOL_FACTOR = 4
+
+
+def _not_connected(user_id: int):
+    """Anti-join: no connection request either way between User and user_id"""
+    return ~exists().where(
+        or_(
+            and_(
+                ConnectionRequest.sender_id == user_id,
+                ConnectionRequest.receiver_id == User.id,
+            ),
+            and_(
+                ConnectionRequest.receiver_id == user_id,
+                ConnectionRequest.sender_id == User.id,
+            ),
+        )
+    )
+
+
+def _probe(db, conditions, pivot: int, limit: int):
+    """
+    Read up to `limit` matching users walking the primary key from a random
+    pivot, wrapping around to the start of the table when the end is hit.
+    Each step is a bounded index range scan, so the cost depends on the
+    page size and not on the number of users.
+    """
+    stmt = select(User).where(*conditions).order_by(User.id).limit(limit)
+
+    people = db.scalars(stmt.where(User.id >= pivot)).all()
+    if len(people) < limit:
+        people += db.scalars(
+            stmt.where(User.id < pivot).limit(limit - len(people))
+        ).all()
+    return people
+
+
+def _shared_skill_counts(db, user_id: int, candidate_ids):
+    """{candidate_id: number of skills shared with user_id}, one grouped query"""
+    if not candidate_ids:
+        return {}
+
+    mine = select(user_skills.c.skill_id).where(user_skills.c.user_id == user_id)
+    rows = db.execute(
+        select(user_skills.c.user_id, func.count())
+        .where(
+            user_skills.c.user_id.in_(candidate_ids),
+            user_skills.c.skill_id.in_(mine),
+        )
+        .group_by(user_skills.c.user_id)
+    ).all()
+    return dict(rows)
+
+
+def sample_people(
+    db, user_id: int, role: str, size: int = SAMPLE_SIZE, rank_by_skills=False
+):
+    """
+    "People you may know": `size` random users with the given role who are
+    not user_id and have no connection request with them. With
+    rank_by_skills, people sharing more skills with user_id come first.
+    """
+    min_id, max_id = db.execute(select(func.min(User.id), func.max(User.id))).one()
+    if min_id is None:
+        return []
+
+    conditions = (User.role == role, User.id != user_id, _not_connected(user_id))
+    pool = _probe(db, conditions, random.randint(min_id, max_id), size * POOL_FACTOR)
+
+    random.shuffle(pool)
+    if rank_by_skills:
+        shared = _shared_skill_counts(db, user_id, [person.id for person in pool])
+        # stable sort: people with as many shared skills stay shuffled
+        pool.sort(key=lambda person: shared.get(person.id, 0), reverse=True)
+    return pool[:size]
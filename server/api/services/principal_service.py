@@ -0,0 +1,58 @@
+import os
+import threading
+
+from cachetools import TTLCache
+from sqlalchemy import select
+from core.models import User
+
+
+# Seconds a snapshot may lag behind a profile change made elsewhere
+# (another worker); changes made in this process invalidate it at once
+PRINCIPAL_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+
+
+class Principal:
+    """Read-only snapshot of the authenticated user for role/ownership checks"""
+
+    __slots__ = ("id", "role", "full_name", "image", "location", "companyName")
+
+    def __init__(self, id, role, full_name, image, location, companyName):
+        self.id = id
+        self.role = role
+        self.full_name = full_name
+        self.image = image
+        self.location = location
+        self.companyName = companyName
+
+    def __repr__(self):
+        return f"<Principal {self.id} {self.role}>"
+
+
+_COLUMNS = [getattr(User, name) for name in Principal.__slots__]
+
+_principals = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_TTL)
+_principals_lock = threading.Lock()
+
+
+def load_principal(db, user_id):
+    """Principal of a user id, from the cache or one narrow SELECT; None if gone"""
+    with _principals_lock:
+        principal = _principals.get(user_id)
+    if principal is not None:
+        return principal
+
+    row = db.execute(select(*_COLUMNS).where(User.id == user_id)).first()
+    if row is None:
+        return None
+
+    principal = Principal(*row)
+    with _principals_lock:
+        _principals[user_id] = principal
+    return principal
+
+
+def invalidate_principal(user_id):
+    """Call after changing a user's role, name, image, location or company"""
+    with _principals_lock:
+        _principals.pop(user_id, None)
@@ -0,0 +1,454 @@
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from cachetools import TTLCache
+from core.models import Job, User, job_skills, user_skills
+
+
+RECOMMENDATION_LIMIT = int(os.getenv("RECOMMENDATION_LIMIT", 200))
+
+# Top-K candidates kept per job shortlist
+SHORTLIST_LIMIT = int(os.getenv("SHORTLIST_LIMIT", 200))
+
+# Score = skill overlap + recency + location; weights sum to 1
+SKILL_WEIGHT = 0.7
+RECENCY_WEIGHT = 0.2
+LOCATION_WEIGHT = 0.1
+
+# A job loses half of its recency score every RECENCY_HALF_LIFE_DAYS
+RECENCY_HALF_LIFE_DAYS = 14
+
+# Full rebuild interval; catches jobs written by other worker processes
+INDEX_TTL = int(os.getenv("RECOMMENDATION_INDEX_TTL", 300))
+
+
+class SkillIndex:
+    """
+    Sparse skill vectors {skill_id: idf} for a set of items (jobs or
+    candidates). Rare skills weigh more than common ones, so matching
+    "Rust" counts for more than matching "Git". The inverted index
+    skill_id -> item ids means scoring only touches items sharing a skill.
+    Weights are derived at query time, so items can be added, changed or
+    removed in place without a rebuild.
+    """
+
+    def __init__(self, item_ids, pairs):
+        self.item_skill_ids = {item_id: set() for item_id in item_ids}
+        self.postings = defaultdict(set)
+        for item_id, skill_id in pairs:
+            if item_id in self.item_skill_ids:
+                self.item_skill_ids[item_id].add(skill_id)
+                self.postings[skill_id].add(item_id)
+        self.built_at = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return len(self.item_skill_ids)
+
+    def weight(self, skill_id) -> float:
+        # Skills no item has yet still count in the query's norm
+        item_count = len(self.postings.get(skill_id, ()))
+        return math.log((self.size + 1) / (item_count + 1)) + 1
+
+    def set_item(self, item_id, skill_ids):
+        """Add an item or replace its skills"""
+        self.remove_item(item_id)
+        self.item_skill_ids[item_id] = set(skill_ids)
+        for skill_id in self.item_skill_ids[item_id]:
+            self.postings[skill_id].add(item_id)
+
+    def remove_item(self, item_id):
+        for skill_id in self.item_skill_ids.pop(item_id, ()):
+            item_ids = self.postings[skill_id]
+            item_ids.discard(item_id)
+            if not item_ids:
+                del self.postings[skill_id]
+
+    def similarities(self, skill_ids):
+        """
+        Yield (item_id, weighted Jaccard) for every item sharing a skill:
+        sum(shared idf) / sum(union idf)
+        """
+        weights = {}
+
+        def weight(skill_id):
+            if skill_id not in weights:
+                weights[skill_id] = self.weight(skill_id)
+            return weights[skill_id]
+
+        skill_ids = set(skill_ids)
+        overlap = defaultdict(float)
+        for skill_id in skill_ids:
+            for item_id in self.postings.get(skill_id, ()):
+                overlap[item_id] += weight(skill_id)
+
+        query_norm = sum(weight(skill_id) for skill_id in skill_ids)
+        for item_id, shared in overlap.items():
+            item_norm = sum(
+                weight(skill_id) for skill_id in self.item_skill_ids[item_id]
+            )
+            yield item_id, shared / (query_norm + item_norm - shared)
+
+
+class JobSkillIndex(SkillIndex):
+    """Every job as a skill vector, with what recency/location scoring needs"""
+
+    def __init__(self, jobs, pairs):
+        self.jobs = {
+            job_id: (created_at, location) for job_id, created_at, location in jobs
+        }
+        super().__init__(self.jobs, pairs)
+
+    @classmethod
+    def build(cls, db):
+        jobs = db.query(Job.id, Job.created_at, Job.location).all()
+        pairs = db.query(job_skills.c.job_id, job_skills.c.skill_id).all()
+        return cls(jobs, pairs)
+
+    def set_job(self, job_id, created_at, location, skill_ids):
+        self.jobs[job_id] = (created_at, location)
+        self.set_item(job_id, skill_ids)
+
+    def remove_job(self, job_id):
+        self.jobs.pop(job_id, None)
+        self.remove_item(job_id)
+
+    def rank(self, skill_ids, location=None, limit=RECOMMENDATION_LIMIT, now=None):
+        """
+        Return ([(job_id, score)], total matches) for a candidate, ordered
+        by (score, job_id) descending; limit=None keeps every match
+        """
+        location = _normalize_location(location)
+        now = now or datetime.utcnow()
+
+        scored = []
+        for job_id, jaccard in self.similarities(skill_ids):
+            created_at, job_location = self.jobs[job_id]
+            score = (
+                SKILL_WEIGHT * jaccard
+                + RECENCY_WEIGHT * _recency(created_at, now)
+                + LOCATION_WEIGHT * _location_match(location, job_location)
+            )
+            scored.append((job_id, round(score, 4)))
+
+        # (score, job_id) is unique, so it doubles as the feed's cursor
+        scored.sort(key=lambda item: (item[1], item[0]), reverse=True)
+        return scored[:limit], len(scored)
+
+
+class CandidateSkillIndex(SkillIndex):
+    """Every candidate as a skill vector, built from user_skills"""
+
+    def __init__(self, candidates, pairs):
+        self.locations = {user_id: location for user_id, location in candidates}
+        super().__init__(self.locations, pairs)
+
+    @classmethod
+    def build(cls, db):
+        candidates = (
+            db.query(User.id, User.location).filter(User.role == "candidate").all()
+        )
+        pairs = (
+            db.query(user_skills.c.user_id, user_skills.c.skill_id)
+            .join(User, User.id == user_skills.c.user_id)
+            .filter(User.role == "candidate")
+            .all()
+        )
+        return cls(candidates, pairs)
+
+    def rank(self, skill_ids, location=None, limit=SHORTLIST_LIMIT):
+        """Return [(user_id, score)] for a job, best first"""
+        location = _normalize_location(location)
+        skill_weight = SKILL_WEIGHT + RECENCY_WEIGHT
+
+        scored = []
+        for user_id, jaccard in self.similarities(skill_ids):
+            score = skill_weight * jaccard + LOCATION_WEIGHT * _location_match(
+                location, self.locations[user_id]
+            )
+            scored.append((user_id, round(score, 4)))
+
+        scored.sort(key=lambda item: (item[1], -item[0]), reverse=True)
+        return scored[:limit]
+
+
+def _recency(created_at, now) -> float:
+    if created_at is None:
+        return 0.0
+    age_days = max((now - created_at).total_seconds(), 0) / 86400
+    return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def _normalize_location(value):
+    return " ".join((value or "").lower().split())
+
+
+def _location_match(user_location: str, job_location) -> float:
+    job_location = _normalize_location(job_location)
+    if not user_location or not job_location:
+        return 0.0
+    if user_location in job_location or job_location in user_location:
+        return 1.0
+    return 0.0
+
+
+# Guards the indexes and the slots below; never held while reading the DB
+_index_lock = threading.Lock()
+
+
+class IndexSlot:
+    """
+    The current index of one kind. Every INDEX_TTL one request rebuilds it
+    from the database outside _index_lock and swaps the new index in;
+    meanwhile the others keep using the previous one. Changes applied
+    during the rebuild are replayed onto the new index.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.index = None
+        self._changes = None
+        self._generation = 0
+        self._rebuild_lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return (
+            self.index is not None
+            and time.monotonic() - self.index.built_at <= INDEX_TTL
+        )
+
+    def get(self, db):
+        with _index_lock:
+            if self._fresh():
+                return self.index
+            current = self.index
+
+        # Only the first build is waited for
+        if not self._rebuild_lock.acquire(blocking=current is None):
+            return current
+        try:
+            with _index_lock:
+                if self._fresh():
+                    return self.index
+                self._changes = []
+                generation = self._generation
+
+            try:
+                index = self.build(db)
+            except Exception:
+                with _index_lock:
+                    self._changes = None
+                raise
+
+            with _index_lock:
+                changes, self._changes = self._changes, None
+                if generation == self._generation:
+                    for method, args in changes:
+                        getattr(index, method)(*args)
+                    self.index = index
+                # else invalidated while building: serve it once, rebuild next
+                return index
+        finally:
+            self._rebuild_lock.release()
+
+    def apply(self, method: str, *args):
+        """index.method(*args) now and on a rebuild in flight; hold _index_lock"""
+        if self._changes is not None:
+            self._changes.append((method, args))
+        if self.index is not None:
+            getattr(self.index, method)(*args)
+
+    def invalidate(self):
+        """Rebuild on next use; hold _index_lock"""
+        self.index = None
+        self._generation += 1
+
+
+_job_indexes = IndexSlot(lambda db: JobSkillIndex.build(db))
+_candidate_indexes = IndexSlot(lambda db: CandidateSkillIndex.build(db))
+
+# Ranked job ids per candidate: {user_id: [(job_id, score)]}
+_recommendation_cache = TTLCache(
+    maxsize=int(os.getenv("RECOMMENDATION_CACHE_SIZE", 4096)),
+    ttl=float(os.getenv("RECOMMENDATION_CACHE_TTL", 300)),
+)
+# Ranked candidate ids per job: {job_id: [(user_id, score)]}
+_shortlist_cache = TTLCache(
+    maxsize=int(os.getenv("SHORTLIST_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("SHORTLIST_CACHE_TTL", 300)),
+)
+_cache_lock = threading.Lock()
+
+
+def get_job_index(db) -> JobSkillIndex:
+    """Build the job index on first use and rebuild it every INDEX_TTL"""
+    return _job_indexes.get(db)
+
+
+def get_candidate_index(db) -> CandidateSkillIndex:
+    """Build the candidate index on first use and rebuild it every INDEX_TTL"""
+    return _candidate_indexes.get(db)
+
+
+def recommend_jobs(db, user_id: int, location=None, depth=RECOMMENDATION_LIMIT):
+    """
+    ([(job_id, score)], total matches) feed for a candidate, best match
+    first. The top RECOMMENDATION_LIMIT matches are cached; a larger depth
+    (None for every match) ranks again without the cache.
+    """
+    cacheable = depth is not None and depth <= RECOMMENDATION_LIMIT
+    if cacheable:
+        with _cache_lock:
+            cached = _recommendation_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    skill_ids = [
+        skill_id
+        for (skill_id,) in db.query(user_skills.c.skill_id).filter(
+            user_skills.c.user_id == user_id
+        )
+    ]
+    index = get_job_index(db)
+    with _index_lock:
+        ranked = index.rank(
+            skill_ids, location, limit=RECOMMENDATION_LIMIT if cacheable else depth
+        )
+
+    if cacheable:
+        with _cache_lock:
+            _recommendation_cache[user_id] = ranked
+    return ranked
+
+
+def recommend_jobs_page(
+    db, user_id: int, location=None, offset=0, after=None, limit=10
+):
+    """
+    One page of a candidate's feed: ([(job_id, score)], total, has_more).
+    The page starts at `offset`, or right after the (score, job_id) key
+    `after` of the previous page's last job. Pages past the cached top
+    matches rank every match, so the whole feed stays reachable.
+    """
+
+    def start_of(ranked):
+        if after is None:
+            return offset
+        return next(
+            (i for i, (job_id, score) in enumerate(ranked) if (score, job_id) < after),
+            len(ranked),
+        )
+
+    ranked, total = recommend_jobs(db, user_id, location)
+    start = start_of(ranked)
+    if start + limit >= len(ranked) and len(ranked) < total:
+        ranked, total = recommend_jobs(db, user_id, location, depth=None)
+        start = start_of(ranked)
+
+    return ranked[start : start + limit], total, start + limit < len(ranked)
+
+
+def shortlist_candidates(db, job: Job):
+    """Cached [(user_id, score)] of the candidates best matching a job"""
+    with _cache_lock:
+        cached = _shortlist_cache.get(job.id)
+    if cached is not None:
+        return cached
+
+    skill_ids = [
+        skill_id
+        for (skill_id,) in db.query(job_skills.c.skill_id).filter(
+            job_skills.c.job_id == job.id
+        )
+    ]
+    index = get_candidate_index(db)
+    with _index_lock:
+        ranked = index.rank(skill_ids, job.location)
+
+    with _cache_lock:
+        _shortlist_cache[job.id] = ranked
+    return ranked
+
+
+# Invalidation hooks, called by controllers after a successful commit
+
+
+def invalidate_user_recommendations(user_id: int):
+    """
+    Drop a candidate's cached feed, e.g. after their skills changed.
+    Shortlists pick the change up when the candidate index is rebuilt.
+    """
+    with _cache_lock:
+        _recommendation_cache.pop(user_id, None)
+
+
+def invalidate_job_index():
+    """
+    Rebuild the job index on next use and drop every cached feed. Only for
+    changes touching many jobs at once (e.g. deleting a skill); single jobs
+    go through update_job_in_index / remove_job_from_index.
+    """
+    with _index_lock:
+        _job_indexes.invalidate()
+    with _cache_lock:
+        _recommendation_cache.clear()
+
+
+def _drop_feeds_matching(skill_ids):
+    """
+    Drop the cached feeds of candidates having one of `skill_ids`, taken
+    from the candidate index; without one, drop every feed. Candidates
+    missing from a stale candidate index catch up within
+    RECOMMENDATION_CACHE_TTL.
+    """
+    with _index_lock:
+        candidate_index = _candidate_indexes.index
+        if candidate_index is None:
+            user_ids = None
+        else:
+            user_ids = set()
+            for skill_id in skill_ids:
+                user_ids.update(candidate_index.postings.get(skill_id, ()))
+
+    with _cache_lock:
+        if user_ids is None:
+            _recommendation_cache.clear()
+            return
+        for user_id in user_ids:
+            _recommendation_cache.pop(user_id, None)
+
+
+def update_job_in_index(job: Job):
+    """Add a created job to the job index, or refresh an edited one"""
+    skill_ids = {skill.id for skill in job.skills}
+    with _index_lock:
+        # Without an index, the next build reads the job from the database
+        job_index = _job_indexes.index
+        old_skill_ids = set()
+        if job_index is not None:
+            old_skill_ids = job_index.item_skill_ids.get(job.id, set())
+        _job_indexes.apply("set_job", job.id, job.created_at, job.location, skill_ids)
+
+    _drop_feeds_matching(old_skill_ids | skill_ids)
+
+
+def remove_job_from_index(job_id: int):
+    """Take a deleted job out of the job index"""
+    with _index_lock:
+        job_index = _job_indexes.index
+        skill_ids = set()
+        if job_index is not None:
+            skill_ids = job_index.item_skill_ids.get(job_id, set())
+        _job_indexes.apply("remove_job", job_id)
+
+    _drop_feeds_matching(skill_ids)
+
+
+def invalidate_job_shortlist(job_id: int):
+    """Drop a job's cached shortlist, e.g. after its skills changed"""
+    with _cache_lock:
+        _shortlist_cache.pop(job_id, None)
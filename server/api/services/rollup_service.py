@@ -0,0 +1,206 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import (
+    Date,
+    String,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from config.db import SessionLocal
+from core.models import (
+    User,
+    Job,
+    Application,
+    DeleteRequest,
+    StatRollup,
+    RollupWatermark,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# metric -> (timestamp column bucketed by day, dimension column or None)
+ROLLUPS = {
+    "users": (User.created_at, User.role),
+    "jobs": (Job.created_at, Job.category_id),
+    "applications": (Application.applied_at, Application.status),
+    "delete_requests": (DeleteRequest.created_at, None),
+}
+
+# An incremental refresh recomputes the days since the watermark minus this
+# window, which picks up recent status changes and deletions
+LOOKBACK_DAYS = int(os.getenv("ROLLUP_LOOKBACK_DAYS", 30))
+
+# Background refresher period; 0 disables the thread
+REFRESH_INTERVAL = int(os.getenv("ROLLUP_REFRESH_SECONDS", 300))
+
+# Full rebuild period, for changes to rows older than the lookback window
+FULL_REFRESH_INTERVAL = int(os.getenv("ROLLUP_FULL_REFRESH_SECONDS", 86400))
+
+# pg advisory lock id so only one worker refreshes at a time
+ROLLUP_LOCK_KEY = 72_001
+
+
+def _daily_counts(metric: str, since: date = None):
+    """(bucket_date, dimension, count) rows of a metric, from its source table"""
+    column, dimension = ROLLUPS[metric]
+
+    day = cast(column, Date)
+    if dimension is not None:
+        dimension = func.coalesce(cast(dimension, String), literal_column("''"))
+        group_by = (day, dimension)
+    else:
+        dimension = literal_column("''")
+        group_by = (day,)
+
+    stmt = (
+        select(
+            day.label("bucket_date"),
+            dimension.label("dimension"),
+            func.count().label("count"),
+        )
+        .where(column.isnot(None))
+        .group_by(*group_by)
+    )
+    if since is not None:
+        stmt = stmt.where(column >= since)
+    return stmt
+
+
+def _refresh_metric(db, metric: str, now, full: bool = False):
+    watermark = db.get(RollupWatermark, metric)
+
+    since = None
+    if not full and watermark is not None:
+        since = (watermark.refreshed_at - timedelta(days=LOOKBACK_DAYS)).date()
+
+    source = _daily_counts(metric, since).subquery()
+    stale = delete(StatRollup).where(StatRollup.metric == metric)
+    if since is not None:
+        stale = stale.where(StatRollup.bucket_date >= since)
+
+    db.execute(stale)
+    db.execute(
+        insert(StatRollup).from_select(
+            ["bucket_date", "metric", "dimension", "count"],
+            select(
+                source.c.bucket_date,
+                literal(metric),
+                source.c.dimension,
+                source.c.count,
+            ),
+        )
+    )
+    db.execute(
+        pg_insert(RollupWatermark)
+        .values(metric=metric, refreshed_at=now)
+        .on_conflict_do_update(index_elements=["metric"], set_={"refreshed_at": now})
+    )
+
+
+def refresh_rollups(db, full: bool = False) -> bool:
+    """
+    Recompute stat_rollups, incrementally from each metric's watermark
+    unless full=True. Changes to rows older than the lookback window (e.g.
+    an old job was deleted) wait for the next full rebuild. Commits. Returns False if another worker holds the refresh lock.
+    """
+    locked = db.scalar(select(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_KEY)))
+    if not locked:
+        db.rollback()
+        return False
+
+    # Database clock, the same one that fills created_at
+    now = db.scalar(select(func.localtimestamp()))
+    for metric in ROLLUPS:
+        _refresh_metric(db, metric, now, full=full)
+    db.commit()
+    return True
+
+
+def rollups_built(db) -> bool:
+    """
+    Whether every metric has been rolled up. The first build is left to
+    the background workers (flask run-workers), never a request.
+    """
+    refreshed = db.scalar(select(func.count()).select_from(RollupWatermark))
+    return refreshed >= len(ROLLUPS)
+
+
+def rollups_refreshed_at(db):
+    """When the oldest metric was last refreshed, None before the first build"""
+    return db.scalar(select(func.min(RollupWatermark.refreshed_at)))
+
+
+def _counts(db, metric: str, since: date = None):
+    """
+    Daily counts of a metric as a subquery: the rollups, or the same
+    aggregate computed live until they are first built
+    """
+    if not rollups_built(db):
+        return _daily_counts(metric, since).subquery()
+
+    stmt = select(StatRollup.bucket_date, StatRollup.dimension, StatRollup.count).where(
+        StatRollup.metric == metric
+    )
+    if since is not None:
+        stmt = stmt.where(StatRollup.bucket_date >= since)
+    return stmt.subquery()
+
+
+def rollup_totals(db, metric: str, since: date = None) -> dict:
+    """{dimension: count} for a metric, optionally from a day onwards"""
+    counts = _counts(db, metric, since)
+    stmt = select(counts.c.dimension, func.sum(counts.c.count)).group_by(
+        counts.c.dimension
+    )
+    return {dimension: int(total) for dimension, total in db.execute(stmt)}
+
+
+def rollup_monthly(db, metric: str, since: date = None):
+    """[(month, count)] for a metric in month order"""
+    counts = _counts(db, metric, since)
+    month = func.date_trunc(literal_column("'month'"), counts.c.bucket_date)
+    stmt = select(month, func.sum(counts.c.count)).group_by(month).order_by(month)
+    return [(bucket, int(total)) for bucket, total in db.execute(stmt)]
+
+
+def _refresh_loop():
+    last_full = None
+    while True:
+        db = SessionLocal()
+        try:
+            full = last_full is None or (
+                time.monotonic() - last_full > FULL_REFRESH_INTERVAL
+            )
+            if refresh_rollups(db, full=full) and full:
+                last_full = time.monotonic()
+        except Exception:
+            db.rollback()
+            logger.exception("Stat rollup refresh failed")
+        finally:
+            db.close()
+        time.sleep(REFRESH_INTERVAL)
+
+
+_refresher = None
+
+
+def start_rollup_refresher():
+    """Start the background refresh thread once per process"""
+    global _refresher
+    if REFRESH_INTERVAL <= 0 or _refresher is not None:
+        return
+    _refresher = threading.Thread(
+        target=_refresh_loop, name="stat-rollups", daemon=True
+    )
+    _refresher.start()
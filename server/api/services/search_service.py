@@ -0,0 +1,283 @@
+import os
+import re
+import threading
+
+from cachetools import TTLCache
+from sqlalchemy import (
+    Float,
+    String,
+    Text,
+    and_,
+    case,
+    cast,
+    func,
+    literal,
+    null,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from core.models import User, Job, Category, Skill, job_skills, user_skills
+
+
+SEARCH_CONFIG = "english"
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _weighted(value, weight: str):
+    return func.setweight(
+        func.to_tsvector(SEARCH_CONFIG, func.coalesce(value, "")), weight
+    )
+
+
+def job_search_document():
+    """
+    SQL expression building the weighted tsvector of a job row:
+    title (A), company and skills (B), category (C), description (D)
+    """
+    category_name = (
+        select(Category.name).where(Category.id == Job.category_id).scalar_subquery()
+    )
+    skill_names = (
+        select(func.string_agg(Skill.name, " "))
+        .select_from(job_skills.join(Skill, Skill.id == job_skills.c.skill_id))
+        .where(job_skills.c.job_id == Job.id)
+        .scalar_subquery()
+    )
+
+    return (
+        _weighted(Job.title, "A")
+        .op("||")(_weighted(Job.company, "B"))
+        .op("||")(_weighted(skill_names, "B"))
+        .op("||")(_weighted(category_name, "C"))
+        .op("||")(_weighted(Job.description, "D"))
+    )
+
+
+def refresh_job_search_vectors(db, job_ids=None):
+    """
+    Recompute Job.search_vector for the given job ids (all jobs when None).
+    Runs inside the caller's transaction; the caller commits.
+    """
+    # keep updated_at untouched: re-indexing is not a user-visible edit
+    stmt = update(Job).values(
+        search_vector=job_search_document(), updated_at=Job.updated_at
+    )
+    if job_ids is not None:
+        job_ids = list(job_ids)
+        if not job_ids:
+            return 0
+        stmt = stmt.where(Job.id.in_(job_ids))
+
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+def build_prefix_tsquery(q: str):
+    """
+    Turn free text into a to_tsquery() string where every term is a prefix
+    match, e.g. "react dev" -> "react:* & dev:*". Returns None if q has no terms.
+    """
+    terms = _TERM_RE.findall((q or "").lower())
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def job_search_clause(q: str):
+    """
+    Return (match_condition, rank_expression) for a full-text job search,
+    or None when the query contains nothing searchable.
+    """
+    query_text = build_prefix_tsquery(q)
+    if query_text is None:
+        return None
+
+    ts_query = func.to_tsquery(SEARCH_CONFIG, query_text)
+    match = Job.search_vector.op("@@")(ts_query)
+    rank = func.ts_rank_cd(Job.search_vector, ts_query, type_=Float)
+    return match, rank
+
+
+SEARCH_LIMITS = {"employers": 6, "candidates": 6, "jobs": 12}
+
+JOB_SNIPPET_LENGTH = 100
+
+
+def _fuzzy_match(column, q: str, like_q: str):
+    # Both operators are served by the gin_trgm_ops indexes on users:
+    # "%" is trigram similarity (typo tolerant), ILIKE catches substrings
+    return or_(column.bool_op("%")(q), column.ilike(like_q))
+
+
+def _people_select(q: str, exclude_user_id=None):
+    """
+    Ranked employers and candidates. Employers match on company name or
+    full name; candidates on full name, headline or one of their skills.
+    Emails are never searched, so they cannot be discovered by guessing.
+    Each person appears once, numbered by rank within their role.
+    """
+    like_q = f"%{q}%"
+
+    skill_match = (
+        select(user_skills.c.user_id)
+        .join(Skill, Skill.id == user_skills.c.skill_id)
+        .where(user_skills.c.user_id == User.id, _fuzzy_match(Skill.name, q, like_q))
+        .exists()
+    )
+
+    score = func.greatest(
+        func.similarity(User.full_name, q),
+        case(
+            (
+                User.role == "employer",
+                func.similarity(func.coalesce(User.companyName, ""), q),
+            ),
+            else_=0,
+        ),
+        func.word_similarity(q, func.coalesce(User.headLine, "")),
+    )
+
+    employer_match = and_(
+        User.role == "employer",
+        or_(
+            _fuzzy_match(User.companyName, q, like_q),
+            _fuzzy_match(User.full_name, q, like_q),
+        ),
+    )
+    candidate_match = and_(
+        User.role == "candidate",
+        or_(
+            _fuzzy_match(User.full_name, q, like_q),
+            _fuzzy_match(User.headLine, q, like_q),
+            skill_match,
+        ),
+    )
+
+    stmt = select(
+        case((User.role == "employer", "employers"), else_="candidates").label("kind"),
+        User.id.label("id"),
+        cast(User.role, String).label("role"),
+        User.full_name.label("title"),
+        cast(User.headLine, Text).label("detail"),
+        User.image.label("image"),
+        score.label("score"),
+        func.row_number()
+        .over(partition_by=User.role, order_by=(score.desc(), User.id))
+        .label("position"),
+    ).where(or_(employer_match, candidate_match))
+
+    if exclude_user_id is not None:
+        stmt = stmt.where(User.id != exclude_user_id)
+
+    return stmt
+
+
+def _jobs_select(q: str):
+    """Ranked full-text job matches, or None when q has no searchable terms"""
+    job_search = job_search_clause(q)
+    if not job_search:
+        return None
+    match, rank = job_search
+
+    return select(
+        literal("jobs").label("kind"),
+        Job.id.label("id"),
+        cast(null(), String).label("role"),
+        cast(Job.title, String).label("title"),
+        func.left(Job.description, JOB_SNIPPET_LENGTH + 1).label("detail"),
+        cast(null(), Text).label("image"),
+        rank.label("score"),
+        func.row_number()
+        .over(order_by=(rank.desc(), Job.created_at.desc(), Job.id))
+        .label("position"),
+    ).where(match)
+
+
+def unified_search(db, q: str, exclude_user_id=None, limits=None):
+    """
+    Search employers, candidates and jobs in one round trip: each entity
+    search is ranked and capped per type in SQL, then combined with UNION ALL.
+    The caller (exclude_user_id) is filtered out in SQL so a full page of
+    results comes back.
+    """
+    limits = {**SEARCH_LIMITS, **(limits or {})}
+    result = {kind: [] for kind in SEARCH_LIMITS}
+
+    q = (q or "").strip()
+    if not q:
+        return result
+
+    people = _people_select(q, exclude_user_id).subquery()
+    branches = [
+        select(people).where(
+            people.c.position
+            <= case(
+                (people.c.kind == "employers", limits["employers"]),
+                else_=limits["candidates"],
+            )
+        )
+    ]
+
+    jobs_stmt = _jobs_select(q)
+    if jobs_stmt is not None:
+        jobs = jobs_stmt.subquery()
+        branches.append(select(jobs).where(jobs.c.position <= limits["jobs"]))
+
+    combined = union_all(*branches).subquery()
+    rows = db.execute(
+        select(combined).order_by(combined.c.kind, combined.c.position)
+    ).all()
+
+    seen = set()
+    for row in rows:
+        key = (row.kind, row.id)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        if row.kind == "jobs":
+            detail = row.detail or ""
+            if len(detail) > JOB_SNIPPET_LENGTH:
+                detail = detail[:JOB_SNIPPET_LENGTH] + "..."
+            result["jobs"].append(
+                {"id": row.id, "title": row.title, "description": detail}
+            )
+        else:
+            result[row.kind].append(
+                {
+                    "id": row.id,
+                    "role": row.role,
+                    "full_name": row.title,
+                    "headLine": row.detail,
+                    "image": row.image,
+                }
+            )
+
+    return result
+
+
+# Short-lived cache of unified search responses. Typing "rea", "reac",
+# "react" and back again hits the same normalized keys within seconds.
+_search_cache = TTLCache(
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", 10)),
+)
+_search_cache_lock = threading.Lock()
+
+
+def cached_unified_search(db, q: str, exclude_user_id=None):
+    """unified_search() memoized per (normalized query, caller)"""
+    key = (" ".join((q or "").lower().split()), exclude_user_id)
+
+    with _search_cache_lock:
+        cached = _search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = unified_search(db, key[0], exclude_user_id=exclude_user_id)
+    with _search_cache_lock:
+        _search_cache[key] = result
+    return result
@@ -0,0 +1,180 @@
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+from flask import jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Files live under UPLOAD_DIR, served by server.py at UPLOAD_URL_PREFIX<key>
+UPLOAD_URL_PREFIX = "/uploads/"
+UPLOAD_DIR = Path(
+    os.getenv("UPLOAD_DIR", Path(__file__).parent.parent.parent / "uploads")
+)
+
+# Request bodies above this are refused by werkzeug while reading (413)
+MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", 16 * 1024 * 1024))
+
+MAX_DOCUMENT_BYTES = int(os.getenv("MAX_DOCUMENT_BYTES", 10 * 1024 * 1024))
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", 5 * 1024 * 1024))
+
+CHUNK_SIZE = 64 * 1024
+
+# extension -> leading bytes of that format
+DOCUMENT_SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),  # OLE2 compound file
+    "docx": (b"PK\x03\x04",),  # zip container, checked by _is_docx()
+}
+IMAGE_SIGNATURES = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "webp": (b"RIFF",),  # + "WEBP" at offset 8, checked in sniff_type()
+}
+
+
+def _is_docx(stream) -> bool:
+    """A zip holding a Word document, not just any archive"""
+    start = stream.tell()
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            names = archive.namelist()
+        return "[Content_Types].xml" in names and any(
+            name.startswith("word/") for name in names
+        )
+    except (zipfile.BadZipFile, OSError, ValueError):
+        return False
+    finally:
+        stream.seek(start)
+
+
+# Formats whose leading bytes are shared with others (zip), by extension
+CONTAINER_CHECKS = {"docx": _is_docx}
+
+
+class UploadError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_type(head: bytes, signatures: dict):
+    """Extension whose signature starts `head`, or None"""
+    for ext, prefixes in signatures.items():
+        if any(head.startswith(prefix) for prefix in prefixes):
+            if ext == "webp" and head[8:12] != b"WEBP":
+                continue
+            return ext
+    return None
+
+
+class LocalStorage:
+    """
+    Files under a directory. Each upload is written to a temp file next
+    to its destination and renamed into place, so readers never see a
+    partial file and a failed upload leaves nothing behind.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def save(self, key, chunks) -> str:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    tmp.write(chunk)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return f"{UPLOAD_URL_PREFIX}{key}"
+
+    def delete(self, key):
+        try:
+            (self.root / key).unlink()
+        except FileNotFoundError:
+            pass
+
+
+_storage = LocalStorage(UPLOAD_DIR)
+
+
+def get_storage():
+    return _storage
+
+
+def set_storage(storage):
+    """Swap the backend; anything with save(key, chunks) -> url and delete(key)"""
+    global _storage
+    _storage = storage
+
+
+def _chunks(stream, head, max_bytes):
+    size = len(head)
+    yield head
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadError(
+                f"File too large, the limit is {max_bytes // (1024 * 1024)} MB", 413
+            )
+        yield chunk
+
+
+def save_upload(file, folder, basename, signatures, max_bytes) -> str:
+    """
+    Store an uploaded FileStorage as <folder>/<basename>.<ext> and return
+    its URL. The extension comes from the file's first bytes, not its
+    name; the content is copied in CHUNK_SIZE pieces and capped at
+    max_bytes. Raises UploadError.
+    """
+    if file is None or not file.filename:
+        raise UploadError("No file selected")
+
+    head = file.stream.read(16)
+    ext = sniff_type(head, signatures)
+    check = CONTAINER_CHECKS.get(ext)
+    if ext is None or (check is not None and not check(file.stream)):
+        allowed = ", ".join(ext.upper() for ext in signatures)
+        raise UploadError(f"Invalid file type. Only {allowed} allowed.")
+
+    key = f"{folder}/{basename}.{ext}"
+    return get_storage().save(key, _chunks(file.stream, head, max_bytes))
+
+
+def delete_upload(url):
+    """
+    Remove a file saved by save_upload, e.g. when the row that was going
+    to point at it could not be written
+    """
+    if url and url.startswith(UPLOAD_URL_PREFIX):
+        get_storage().delete(url[len(UPLOAD_URL_PREFIX) :])
+
+
+def save_document(file, folder, basename) -> str:
+    return save_upload(file, folder, basename, DOCUMENT_SIGNATURES, MAX_DOCUMENT_BYTES)
+
+
+def save_image(file, folder, basename) -> str:
+    return save_upload(file, folder, basename, IMAGE_SIGNATURES, MAX_IMAGE_BYTES)
+
+
+def _request_too_large(e):
+    limit = MAX_CONTENT_LENGTH // (1024 * 1024)
+    return jsonify({"error": f"Request too large, the limit is {limit} MB"}), 413
+
+
+def init_app(app):
+    """
+    Refuse request bodies over MAX_CONTENT_LENGTH while werkzeug reads
+    them, answering with a JSON 413
+    """
+    app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+    app.register_error_handler(RequestEntityTooLarge, _request_too_large)
@@ -0,0 +1,70 @@
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import func, select
+from config.db import engine
+from services.email import start_email_sender
+from services.notification_service import start_notification_fanout
+from services.rollup_service import start_rollup_refresher
+
+logger = logging.getLogger(__name__)
+
+
+# pg advisory lock held by the one process running the polling workers
+WORKERS_LOCK_KEY = 72_002
+
+# How often a standby process retries the lock
+WORKERS_RETRY_SECONDS = int(os.getenv("WORKERS_RETRY_SECONDS", 30))
+
+_lock_connection = None
+_starter = None
+
+
+def _acquire_workers_lock():
+    """
+    Block until this process holds the workers lock. The session-level
+    lock lives as long as the connection, which is kept open for good;
+    if this process dies, a standby takes over on its next retry.
+    """
+    while True:
+        conn = engine.connect()
+        try:
+            if conn.scalar(select(func.pg_try_advisory_lock(WORKERS_LOCK_KEY))):
+                conn.commit()
+                return conn
+            conn.rollback()
+        except Exception:
+            logger.exception("Could not take the background workers lock")
+        conn.close()
+        time.sleep(WORKERS_RETRY_SECONDS)
+
+
+def _lead():
+    global _lock_connection
+    _lock_connection = _acquire_workers_lock()
+    logger.info("Running background workers in process %s", os.getpid())
+    start_rollup_refresher()
+    start_email_sender()
+    start_notification_fanout()
+
+
+def start_background_workers():
+    """
+    Run the stat rollup refresher, the outbound email sender and the
+    job_posted notification fan-out in this process once it holds the
+    workers lock, so a single process polls the database however many
+    web workers there are. Returns right away.
+    """
+    global _starter
+    if _starter is not None:
+        return
+    _starter = threading.Thread(target=_lead, name="workers-leader", daemon=True)
+    _starter.start()
+
+
+def run_background_workers():
+    """Foreground variant for `flask run-workers`, never returns"""
+    _lead()
+    threading.Event().wait()
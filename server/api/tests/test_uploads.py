@@ -0,0 +1,149 @@
+import io
+import os
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+# server/api is the import root, as when running server.py
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+from types import SimpleNamespace
+
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+from middlewares.auth import encode_token
+from controllers import candidates
+from routes.job import job
+from services import upload_service
+from services.upload_service import UploadError, save_document
+
+
+def _zip(**files) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    previous = upload_service.get_storage()
+    upload_service.set_storage(upload_service.LocalStorage(tmp_path))
+    yield tmp_path
+    upload_service.set_storage(previous)
+
+
+@pytest.fixture
+def client(storage):
+    app = Flask(__name__)
+    upload_service.init_app(app)
+    app.config["MAX_CONTENT_LENGTH"] = 1024
+    app.register_blueprint(job, url_prefix="/api/jobs")
+    return app.test_client()
+
+
+def test_oversized_request_is_refused_with_413(client):
+    token = encode_token({"id": 1, "exp": int(time.time()) + 60})
+    response = client.post(
+        "/api/jobs/1/apply",
+        data={"cv_file": (io.BytesIO(b"%PDF-" + b"x" * 4096), "cv.pdf")},
+        headers={"Authorization": f"Bearer {token}"},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 413
+    assert "too large" in response.get_json()["error"]
+
+
+def test_plain_zip_is_not_a_docx(storage):
+    upload = FileStorage(io.BytesIO(_zip(**{"notes.txt": "hi"})), filename="cv.docx")
+
+    with pytest.raises(UploadError):
+        save_document(upload, "cvs", "cv_1")
+    assert not any(storage.rglob("cv_1*"))
+
+
+def test_word_document_is_stored_as_docx(storage):
+    content = _zip(**{"[Content_Types].xml": "<Types/>", "word/document.xml": "<w/>"})
+    upload = FileStorage(io.BytesIO(content), filename="cv.zip")
+
+    assert save_document(upload, "cvs", "cv_1") == "/uploads/cvs/cv_1.docx"
+    assert (storage / "cvs" / "cv_1.docx").read_bytes() == content
+
+
+def test_document_over_the_cap_is_not_stored(storage, monkeypatch):
+    monkeypatch.setattr(upload_service, "MAX_DOCUMENT_BYTES", 1024)
+    upload = FileStorage(io.BytesIO(b"%PDF-" + b"x" * 4096), filename="cv.pdf")
+
+    with pytest.raises(UploadError) as error:
+        save_document(upload, "cvs", "cv_1")
+    assert error.value.status == 413
+    assert not any(path.is_file() for path in storage.rglob("*"))
+
+
+class _Session:
+    """Just enough of a Session for the upload controllers"""
+
+    def __init__(self, user, fail_commit=False):
+        self.user = user
+        self.fail_commit = fail_commit
+        self.model = None
+
+    def query(self, model):
+        self.model = model
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def first(self):
+        return self.user if self.model is candidates.User else None
+
+    def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit failed")
+
+    def rollback(self):
+        pass
+
+
+def _upload_cv(monkeypatch, session):
+    monkeypatch.setattr(candidates, "get_db", lambda: session)
+    app = Flask(__name__)
+    with app.test_request_context(
+        method="POST",
+        data={"cv": (io.BytesIO(b"%PDF-1.7 new"), "cv.pdf")},
+        content_type="multipart/form-data",
+    ):
+        return candidates.upload_cv(1)
+
+
+def test_replaced_cv_is_deleted(storage, monkeypatch):
+    (storage / "cvs").mkdir()
+    (storage / "cvs" / "cv_1.pdf").write_bytes(b"%PDF-1.7 old")
+    user = SimpleNamespace(resume_url="/uploads/cvs/cv_1.pdf")
+
+    response, status = _upload_cv(monkeypatch, _Session(user))
+
+    assert status == 200
+    assert user.resume_url != "/uploads/cvs/cv_1.pdf"
+    assert [path.name for path in (storage / "cvs").iterdir()] == [
+        user.resume_url.rsplit("/", 1)[1]
+    ]
+
+
+def test_cv_is_kept_when_the_update_fails(storage, monkeypatch):
+    (storage / "cvs").mkdir()
+    (storage / "cvs" / "cv_1.pdf").write_bytes(b"%PDF-1.7 old")
+    user = SimpleNamespace(resume_url="/uploads/cvs/cv_1.pdf")
+
+    response, status = _upload_cv(monkeypatch, _Session(user, fail_commit=True))
+
+    assert status == 500
+    assert [path.name for path in (storage / "cvs").iterdir()] == ["cv_1.pdf"]
+    assert (storage / "cvs" / "cv_1.pdf").read_bytes() == b"%PDF-1.7 old"
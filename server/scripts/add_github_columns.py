@@ -6,11 +6,11 @@ import os
 import sys
 from pathlib import Path
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 # Load environment variables
 env_path = Path(__file__).parent.parent / ".env"
@@ -27,7 +27,9 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NA
 
 def add_github_columns():
     """Add github_id and github_username columns to users table"""
-    engine = create_engine(DATABASE_URL)
+    from config.db import make_engine
+
+    engine = make_engine(DATABASE_URL, statement_timeout_ms=0)
 
     try:
         with engine.connect() as conn:
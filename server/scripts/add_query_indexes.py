@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the composite indexes that keyset pagination
+and the feed queries were written for, on existing databases (init-db only
+creates indexes together with their table)
+"""
+import os
+import sys
+from pathlib import Path
+
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_USER = os.getenv("DB_USERNAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# index name -> (table, columns)
+QUERY_INDEXES = {
+    # Job listings: keyset seeks on (created_at, id)
+    "ix_jobs_created_at_id": ("jobs", ("created_at", "id")),
+    "ix_jobs_employer_id_created_at_id": (
+        "jobs",
+        ("employer_id", "created_at", "id"),
+    ),
+    # Connection status checks, looked up from either side
+    "ix_connection_requests_sender_receiver": (
+        "connection_requests",
+        ("sender_id", "receiver_id"),
+    ),
+    "ix_connection_requests_receiver_sender": (
+        "connection_requests",
+        ("receiver_id", "sender_id"),
+    ),
+    # skill -> candidates lookups of the job_posted fan-out
+    "ix_user_skills_skill_user": ("user_skills", ("skill_id", "user_id")),
+    # Notification feed (keyset on created_at, id) and unread badge
+    "ix_notifications_receiver_created_id": (
+        "notifications",
+        ("receiver_id", "created_at", "id"),
+    ),
+    "ix_notifications_receiver_is_read_created": (
+        "notifications",
+        ("receiver_id", "is_read", "created_at"),
+    ),
+}
+
+
+def add_query_indexes():
+    """Create each index without blocking writes to its table"""
+    from config.db import make_engine
+
+    engine = make_engine(DATABASE_URL, statement_timeout_ms=0)
+
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for index_name, (table, columns) in QUERY_INDEXES.items():
+                print(f"Creating {index_name}...")
+                column_list = ", ".join(f'"{column}"' for column in columns)
+                conn.execute(
+                    text(
+                        f"""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name}
+                    ON public.{table} ({column_list})
+                """
+                    )
+                )
+                print(f"✓ {index_name} ready")
+
+        print("\n✅ Migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        return False
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Running database migration to add the query indexes...\n")
+    success = add_query_indexes()
+    sys.exit(0 if success else 1)
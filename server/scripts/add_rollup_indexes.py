@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the created_at indexes scanned by incremental
+stat rollup refreshes on existing databases
+"""
+import os
+import sys
+from pathlib import Path
+
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_USER = os.getenv("DB_USERNAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# index name -> (table, column)
+ROLLUP_INDEXES = {
+    "ix_users_created_at": ("users", "created_at"),
+    "ix_applications_applied_at": ("applications", "applied_at"),
+    "ix_delete_requests_created_at": ("delete_requests", "created_at"),
+}
+
+
+def add_rollup_indexes():
+    """Create each index without blocking writes to its table"""
+    from config.db import make_engine
+
+    engine = make_engine(DATABASE_URL, statement_timeout_ms=0)
+
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for index_name, (table, column) in ROLLUP_INDEXES.items():
+                print(f"Creating {index_name}...")
+                conn.execute(
+                    text(
+                        f"""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name}
+                    ON public.{table} ({column})
+                """
+                    )
+                )
+                print(f"✓ {index_name} ready")
+
+        print("\n✅ Migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        return False
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Running database migration to index stat rollup sources...\n")
+    success = add_rollup_indexes()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the jobs.search_vector full-text column, its GIN
+index, and backfill it for existing rows
+"""
+import os
+import sys
+from pathlib import Path
+
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_USER = os.getenv("DB_USERNAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+BATCH_SIZE = int(os.getenv("SEARCH_BACKFILL_BATCH_SIZE", 500))
+
+
+def backfill_job_search():
+    """Create the search_vector column and GIN index, then fill every job"""
+    from config.db import make_engine
+    from core.models import Job
+    from services.search_service import refresh_job_search_vectors
+
+    engine = make_engine(DATABASE_URL, statement_timeout_ms=0)
+
+    try:
+        with engine.connect() as conn:
+            print("Ensuring jobs.search_vector column exists...")
+            conn.execute(
+                text(
+                    """
+                ALTER TABLE public.jobs
+                ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+            """
+                )
+            )
+            print("Ensuring GIN index exists...")
+            conn.execute(
+                text(
+                    """
+                CREATE INDEX IF NOT EXISTS ix_jobs_search_vector
+                ON public.jobs USING gin (search_vector)
+            """
+                )
+            )
+            conn.commit()
+            print("✓ Column and index ready")
+
+        # Backfill in id-ordered batches so each transaction stays short
+        updated = 0
+        last_id = 0
+        with Session(engine) as session:
+            while True:
+                job_ids = session.scalars(
+                    select(Job.id)
+                    .where(Job.id > last_id)
+                    .order_by(Job.id)
+                    .limit(BATCH_SIZE)
+                ).all()
+                if not job_ids:
+                    break
+
+                updated += refresh_job_search_vectors(session, job_ids)
+                session.commit()
+                last_id = job_ids[-1]
+                print(f"✓ Indexed {updated} jobs")
+
+        print("\n✅ Backfill completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during backfill: {e}")
+        return False
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Running full-text search backfill for jobs...\n")
+    success = backfill_job_search()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure password hashing throughput, to size PASSWORD_HASH_METHOD and
+PASSWORD_HASH_WORKERS against the login rate a server must handle.
+
+    python scripts/bench_password_hash.py
+    python scripts/bench_password_hash.py --method pbkdf2:sha256:600000 --seconds 5
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+
+def _hashes_per_second(method, seconds, threads):
+    from werkzeug.security import generate_password_hash
+
+    deadline = time.perf_counter() + seconds
+
+    def work():
+        count = 0
+        while time.perf_counter() < deadline:
+            generate_password_hash("correct horse battery staple", method=method)
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(lambda _: work(), range(threads)))
+    return total / (time.perf_counter() - started)
+
+
+def bench_password_hash(method, seconds, threads):
+    """Print hashes/sec on one core and on `threads` cores"""
+    from werkzeug.security import generate_password_hash
+
+    expanded = generate_password_hash("", method=method).split("$", 1)[0]
+    print(f"Method: {expanded}")
+
+    single = _hashes_per_second(method, seconds, 1)
+    print(f"✓ 1 thread: {single:.1f} hashes/sec ({1000 / single:.1f} ms per login)")
+
+    if threads > 1:
+        parallel = _hashes_per_second(method, seconds, threads)
+        print(
+            f"✓ {threads} threads: {parallel:.1f} hashes/sec "
+            f"({parallel / threads:.1f} per core)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--method",
+        default=os.getenv("PASSWORD_HASH_METHOD", "scrypt"),
+        help="werkzeug hash method, defaults to PASSWORD_HASH_METHOD",
+    )
+    parser.add_argument("--seconds", type=float, default=3, help="per measurement")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="threads for the parallel run (default: all cores)",
+    )
+    args = parser.parse_args()
+
+    try:
+        bench_password_hash(args.method, args.seconds, args.threads)
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    sys.exit(0)
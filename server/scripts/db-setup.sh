@@ -4,4 +4,5 @@ export PGUSER="postgres"
 
 psql -c "CREATE DATABASE hireradar"
 
-psql hireradar -c "CREATE EXTENSION IF NOT EXISTS \"uuid-ossp\";"
\ No newline at end of file
+psql hireradar -c "CREATE EXTENSION IF NOT EXISTS \"uuid-ossp\";"
+psql hireradar -c "CREATE EXTENSION IF NOT EXISTS pg_trgm;"
\ No newline at end of file
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Migration script to enable pg_trgm and create the trigram indexes used by
+people search on existing databases
+"""
+import os
+import sys
+from pathlib import Path
+
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_USER = os.getenv("DB_USERNAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+TRIGRAM_COLUMNS = ("full_name", "companyName", "headLine")
+
+# Emails are not searchable; drop the index earlier runs created for it
+DROPPED_INDEXES = ("ix_users_email_trgm",)
+
+
+def enable_trigram_search():
+    """Enable pg_trgm and add a GIN trigram index per searchable users column"""
+    from config.db import make_engine
+
+    engine = make_engine(DATABASE_URL, statement_timeout_ms=0)
+
+    try:
+        with engine.connect() as conn:
+            print("Enabling pg_trgm extension...")
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.commit()
+            print("✓ pg_trgm enabled")
+
+            for column in TRIGRAM_COLUMNS:
+                index_name = f"ix_users_{column.lower()}_trgm"
+                print(f"Creating {index_name}...")
+                conn.execute(
+                    text(
+                        f"""
+                    CREATE INDEX IF NOT EXISTS {index_name}
+                    ON public.users USING gin ("{column}" gin_trgm_ops)
+                """
+                    )
+                )
+                conn.commit()
+                print(f"✓ {index_name} ready")
+
+            for index_name in DROPPED_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+                conn.commit()
+                print(f"✓ {index_name} dropped")
+
+        print("\n✅ Migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        return False
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Running database migration to enable trigram people search...\n")
+    success = enable_trigram_search()
+    sys.exit(0 if success else 1)
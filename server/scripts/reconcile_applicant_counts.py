@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Migration / maintenance script for the jobs.applicants_count counter.
+Adds the column if it is missing, then resets every job whose counter
+drifted from job_applicants. Safe to run repeatedly (e.g. from cron).
+"""
+import os
+import sys
+from pathlib import Path
+
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_USER = os.getenv("DB_USERNAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def reconcile_applicant_counts():
+    """Ensure jobs.applicants_count exists and matches job_applicants"""
+    from config.db import make_engine
+    from services.applications_service import (
+        reconcile_applicant_counts as reconcile,
+    )
+
+    engine = make_engine(DATABASE_URL, statement_timeout_ms=0)
+
+    try:
+        with engine.connect() as conn:
+            print("Ensuring jobs.applicants_count column exists...")
+            conn.execute(
+                text(
+                    """
+                ALTER TABLE public.jobs
+                ADD COLUMN IF NOT EXISTS applicants_count INTEGER NOT NULL DEFAULT 0
+            """
+                )
+            )
+            conn.commit()
+            print("✓ Column ready")
+
+        with Session(engine) as session:
+            print("Reconciling applicant counters...")
+            fixed = reconcile(session)
+            session.commit()
+            print(f"✓ Fixed {fixed} jobs")
+
+        print("\n✅ Reconciliation completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during reconciliation: {e}")
+        return False
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Reconciling job applicant counters...\n")
+    success = reconcile_applicant_counts()
+    sys.exit(0 if success else 1)
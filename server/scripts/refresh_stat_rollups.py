@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Refresh the stat_rollups tables behind the admin charts.
+
+    python scripts/refresh_stat_rollups.py          # incremental, from the watermark
+    python scripts/refresh_stat_rollups.py --full   # rebuild every day
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Make the api package importable (config, core, services)
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_USER = os.getenv("DB_USERNAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def refresh_stat_rollups(full=False):
+    """Run one rollup refresh"""
+    from config.db import make_engine
+    from services.rollup_service import refresh_rollups
+
+    engine = make_engine(DATABASE_URL, statement_timeout_ms=0)
+
+    try:
+        with Session(engine) as session:
+            if not refresh_rollups(session, full=full):
+                print("⚠ Another refresh is running, skipped")
+                return True
+
+        print("\n✅ Rollups refreshed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during refresh: {e}")
+        return False
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--full", action="store_true", help="rebuild instead of refreshing"
+    )
+    args = parser.parse_args()
+
+    print(f"Running {'full' if args.full else 'incremental'} rollup refresh...\n")
+    success = refresh_stat_rollups(full=args.full)
+    sys.exit(0 if success else 1)
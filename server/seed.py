@@ -1,7 +1,6 @@
 import random
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
 from faker import Faker
 import os
 import sys
@@ -10,6 +9,8 @@ from dotenv import load_dotenv
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'api')))
 
+from config.db import engine
+from services.search_service import refresh_job_search_vectors
 from core.models import (
     Base,
     User,
@@ -31,16 +32,7 @@ from core.models import (
 # ================== LOAD ENV ==================
 load_dotenv()
 
-DB_USER = os.getenv("DB_USERNAME")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
 # ================== SETUP ==================
-engine = create_engine(DATABASE_URL, echo=False)
 session = Session(engine)
 faker = Faker()
 Base.metadata.create_all(engine)
@@ -156,6 +148,11 @@ for job in jobs_list:
 session.commit()
 print("✓ Assigned skills to jobs")
 
+# Jobs inserted directly skip create_job, so build their search vectors here
+refresh_job_search_vectors(session)
+session.commit()
+print("✓ Indexed jobs for search")
+
 # ================== SEED APPLICATIONS ==================
 print("Seeding applications...")
 candidates = [u for u in users_list if u.role == "candidate"]